@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+""" Benchmark of the memory used per node, socket and wire object, as
+measured by tracemalloc. Memory allocated by wxWidgets itself for the
+wx.Point and wx.Size values is not seen by tracemalloc.
+
+Run from the root of the repository with: python -m benchmarks.bench_memory
+"""
+
+import gc
+import tracemalloc
+
+import wx
+
+from gsnodegraph.node import NodeBase, NodeSocket, NodeWire
+from gsnodegraph.constants import SOCKET_INPUT, SOCKET_OUTPUT
+
+COUNT = 100000
+
+
+class Graph(object):
+    """ Just enough of a nodegraph for creating nodes outside of a window. """
+    def UpdateNodeIndex(self, node) -> None:
+        pass
+
+
+class HostNode(NodeBase):
+    """ Node subclass without slots, like those of an application. """
+    def __init__(self, nodegraph, _id):
+        NodeBase.__init__(self, nodegraph, _id)
+        self.label = "Host"
+
+
+def Measure(create):
+    """ Get the bytes per object made by calling create COUNT times. """
+    objects = [None] * COUNT
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(COUNT):
+        objects[i] = create(i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / COUNT
+
+
+def Run():
+    graph = Graph()
+    node = NodeBase(graph, 0)
+    src = NodeSocket("Output", "output", "IMAGE", node, SOCKET_OUTPUT)
+    dst = NodeSocket("Input", "input", "IMAGE", node, SOCKET_INPUT)
+    pnt1 = wx.Point(0, 0)
+    pnt2 = wx.Point(100, 100)
+
+    results = [
+        ("node", Measure(lambda i: NodeBase(graph, i))),
+        ("node (subclass)", Measure(lambda i: HostNode(graph, i))),
+        ("socket", Measure(lambda i: NodeSocket("Input", "input", "IMAGE",
+                                                node, SOCKET_INPUT))),
+        ("wire", Measure(lambda i: NodeWire(graph, pnt1, pnt2, src, dst,
+                                            SOCKET_OUTPUT, 10))),
+    ]
+    for name, size in results:
+        print("{:>6} x {:<16} {:>8.0f} bytes each".format(COUNT, name, size))
+
+
+if __name__ == "__main__":
+    app = wx.App(False)
+    Run()
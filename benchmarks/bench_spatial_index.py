@@ -0,0 +1,84 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+""" Benchmark of the node spatial index against a linear scan over all of
+the node rects, for point (click) and rect (box select) queries.
+
+Run from the root of the repository with: python -m benchmarks.bench_spatial_index
+"""
+
+import random
+import timeit
+
+from gsnodegraph.constants import NODE_DEFAULT_WIDTH
+from gsnodegraph.graph.utils.spatial import SpatialGrid
+
+QUERIES = 1000
+
+
+def Intersects(a, b):
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+def CreateRects(count):
+    # Lay the nodes out with roughly the density of a real graph
+    extent = int((count ** 0.5) * NODE_DEFAULT_WIDTH * 1.5)
+    return [(random.randint(0, extent), random.randint(0, extent),
+             NODE_DEFAULT_WIDTH, random.randint(80, 250))
+            for i in range(count)], extent
+
+
+def Run(count):
+    rects, extent = CreateRects(count)
+    grid = SpatialGrid()
+    for i, rect in enumerate(rects):
+        grid.Insert(i, rect)
+
+    points = [(random.randint(0, extent), random.randint(0, extent), 16, 16)
+              for i in range(QUERIES)]
+    boxes = [(random.randint(0, extent), random.randint(0, extent), 600, 400)
+             for i in range(QUERIES)]
+
+    def LinearQuery(queries):
+        for query in queries:
+            [i for i, rect in enumerate(rects) if Intersects(query, rect)]
+
+    def GridQuery(queries):
+        for query in queries:
+            grid.QueryRect(query)
+
+    def GridUpdate():
+        for i in range(QUERIES):
+            x, y, w, h = rects[i % count]
+            grid.Update(i % count, (x + 10, y + 10, w, h))
+
+    results = [
+        ("point, linear", timeit.timeit(lambda: LinearQuery(points), number=1)),
+        ("point, grid", timeit.timeit(lambda: GridQuery(points), number=1)),
+        ("rect, linear", timeit.timeit(lambda: LinearQuery(boxes), number=1)),
+        ("rect, grid", timeit.timeit(lambda: GridQuery(boxes), number=1)),
+        ("update, grid", timeit.timeit(GridUpdate, number=1)),
+    ]
+    for name, seconds in results:
+        print("{:>6} nodes  {:<14} {:>10.2f} us/op".format(
+            count, name, seconds / QUERIES * 1e6))
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for count in (1000, 10000, 50000):
+        Run(count)
@@ -5,5 +5,9 @@ from .graph import (NodeGraphBase,
                     EVT_GSNODEGRAPH_NODEDISCONNECT,
                     EVT_GSNODEGRAPH_NODECONNECT,
                     EVT_GSNODEGRAPH_MOUSEZOOM,
-                    EVT_GSNODEGRAPH_ADDNODEBTN)
+                    EVT_GSNODEGRAPH_ADDNODEBTN,
+                    EVT_GSNODEGRAPH_BATCHEDIT,
+                    EVT_GSNODEGRAPH_EVALUATED,
+                    GraphEvaluator,
+                    PreviewContext)
 from .node import NodeBase, NodeSocket, NodeWire
@@ -1 +1,2 @@
 from .bitmaps import *
+from .cache import AssetCache, GetAssetBitmap, GetAssetImage
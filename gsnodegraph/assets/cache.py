@@ -0,0 +1,65 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+
+class AssetCache(object):
+    """ Cache of the decoded embedded images. Each call to
+    ``PyEmbeddedImage.GetBitmap`` decodes the base64 and PNG data again,
+    whereas here each asset is only decoded the first time it is used.
+    The bitmaps are shared, so they should not be drawn into.
+    """
+    def __init__(self):
+        self.bitmaps = {}
+        self.images = {}
+
+    def GetBitmap(self, asset):
+        """ Get the decoded wx.Bitmap of the given ``PyEmbeddedImage``. """
+        bitmap = self.bitmaps.get(asset)
+        if bitmap is None:
+            bitmap = asset.GetBitmap()
+            self.bitmaps[asset] = bitmap
+        return bitmap
+
+    def GetImage(self, asset):
+        """ Get the decoded wx.Image of the given ``PyEmbeddedImage``. """
+        image = self.images.get(asset)
+        if image is None:
+            image = asset.GetImage()
+            self.images[asset] = image
+        return image
+
+    def Clear(self) -> None:
+        self.bitmaps = {}
+        self.images = {}
+
+
+# The decoded assets are shared by all nodegraphs
+asset_cache = AssetCache()
+
+
+def GetAssetBitmap(asset):
+    """ Get the bitmap of the embedded image asset,
+    decoding it only the first time it is used.
+    """
+    return asset_cache.GetBitmap(asset)
+
+
+def GetAssetImage(asset):
+    """ Get the image of the embedded image asset,
+    decoding it only the first time it is used.
+    """
+    return asset_cache.GetImage(asset)
+
@@ -52,3 +52,34 @@ GRAPH_BACKGROUND_COLOR = (30, 36, 41, 255)
 BTN_NORMAL_COLOR = (0, 0, 0, 0)
 BTN_CLICKED_COLOR = (90, 127, 200, 255)
 BTN_FOCUSED_COLOR = (54, 56, 60, 255)
+
+SPRITE_CACHE_BUDGET = 64 * 1024 * 1024
+
+LOD_FULL = 0
+LOD_SIMPLE = 1
+LOD_MINIMAL = 2
+
+LOD_SIMPLE_ZOOM = 70
+LOD_MINIMAL_ZOOM = 40
+
+# Zoom range of the mousewheel (in percent), which reaches every level of detail
+MOUSEWHEEL_MIN_ZOOM = 20
+MOUSEWHEEL_MAX_ZOOM = 310
+
+DEFAULT_MAX_FPS = 60
+
+SPATIAL_GRID_CELL_SIZE = 256
+
+WIRE_HIT_TOLERANCE = 6
+KNIFE_LINE_COLOR = (232, 76, 61, 255)
+
+RESULT_CACHE_BUDGET = 256 * 1024 * 1024
+
+PREVIEW_SCALES = (0.25, 1.0)
+PREVIEW_DEBOUNCE_DELAY = 30
+
+HEATMAP_HOT_COLOR = (235, 80, 35, 255)
+
+NODE_THUMB_SIZE = 120
+
+GEOMETRY_INITIAL_CAPACITY = 1024
@@ -5,4 +5,6 @@ from .base import (NodeGraphBase,
                    EVT_GSNODEGRAPH_NODEDISCONNECT,
                    EVT_GSNODEGRAPH_NODECONNECT,
                    EVT_GSNODEGRAPH_MOUSEZOOM,
-                   EVT_GSNODEGRAPH_ADDNODEBTN)
+                   EVT_GSNODEGRAPH_ADDNODEBTN,
+                   EVT_GSNODEGRAPH_BATCHEDIT)
+from .evaluator import GraphEvaluator, PreviewContext, EVT_GSNODEGRAPH_EVALUATED
@@ -14,24 +14,39 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 
+import contextlib
+import time
 import uuid
 import wx
 import wx.lib.agw.flatmenu as flatmenu
 from wx.lib.newevent import NewCommandEvent
 
 from gsnodegraph.node import NodeWire
-from gsnodegraph.constants import (GRAPH_BACKGROUND_COLOR, SOCKET_OUTPUT,
+from gsnodegraph.constants import (GRAPH_BACKGROUND_COLOR, SOCKET_OUTPUT, SOCKET_RADIUS,
                                    SELECTION_BOX_COLOR, SELECTION_BOX_BORDER_COLOR,
-                                   DEFAULT_WIRE_CURVATURE)
+                                   DEFAULT_WIRE_CURVATURE, SPRITE_CACHE_BUDGET,
+                                   LOD_FULL, LOD_SIMPLE, LOD_MINIMAL,
+                                   LOD_SIMPLE_ZOOM, LOD_MINIMAL_ZOOM,
+                                   MOUSEWHEEL_MIN_ZOOM, MOUSEWHEEL_MAX_ZOOM,
+                                   DEFAULT_MAX_FPS, WIRE_HIT_TOLERANCE,
+                                   KNIFE_LINE_COLOR)
 from gsnodegraph.assets import ICON_ADD_NODE
 from .utils.z_matrix import ZMatrix
+from .utils.sprite_cache import NodeSpriteCache
+from .utils.resources import DrawingResources
+from .utils.spatial import SpatialGrid
+from .utils.topo import TopologicalOrder
+from .utils.geometry import NodeGeometry, HasNumPy
 from .btn import AddNodeBtn
+from .renderer import GraphRenderer
+from .evaluator import GraphEvaluator
 
 gsnodegraph_nodeselect_cmd_event, EVT_GSNODEGRAPH_NODESELECT = NewCommandEvent()
 gsnodegraph_nodeconnect_cmd_event, EVT_GSNODEGRAPH_NODECONNECT = NewCommandEvent()
 gsnodegraph_nodedisconnect_cmd_event, EVT_GSNODEGRAPH_NODEDISCONNECT = NewCommandEvent()
 gsnodegraph_mousezoom_cmd_event, EVT_GSNODEGRAPH_MOUSEZOOM = NewCommandEvent()
 gsnodegraph_addnodebtn_cmd_event, EVT_GSNODEGRAPH_ADDNODEBTN = NewCommandEvent()
+gsnodegraph_batchedit_cmd_event, EVT_GSNODEGRAPH_BATCHEDIT = NewCommandEvent()
 
 ID_CONTEXTMENU_DELETENODE = wx.NewIdRef()
 ID_CONTEXTMENU_MUTENODE = wx.NewIdRef()
@@ -54,18 +69,58 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.image_datatype = config["image_datatype"]
         self.input_nodes_categories = config["input_nodes_categories"]
 
+        # Shared pens, brushes and colours for drawing
+        self.resources = DrawingResources(self.node_categories,
+                                          self.node_datatypes)
+
         self.matrix = ZMatrix()
         self.identity = ZMatrix()
         self.matrix.Reset()
         self.identity.Reset()
 
+        self.renderer = None
+        self.antialias = True
         self.buffer = None
         self.bg_img = None
         self.zoom = 100
 
-        self.wires = []
+        # The wires are kept in a dict (used as an ordered set)
+        # so that they can be removed in constant time. See wires.
+        self._wires = {}
         self.nodes = {}
 
+        # Connection indexes, kept up to date by ConnectNodes
+        # and DisconnectNodes. See CheckConnectionIndexes.
+        self.input_wires = {}  # input (dst) socket -> wire
+        self.output_wires = {}  # output (src) socket -> {wire: None}
+        self.node_wires = {}  # node -> {wire: None}
+        self.connections = {}  # (src socket, dst socket) -> wire
+
+        # Layout templates of the node types, see NodeBase.Init
+        self.layout_templates = {}
+
+        # Evaluation order of the nodes, which is
+        # also used to reject connections making cycles.
+        self.topo_order = TopologicalOrder()
+
+        # Nodes whose results are out of date, with the
+        # version they were marked at. See MarkDirty.
+        self.dirty_nodes = {}
+        self.dirty_version = 0
+
+        # Evaluates the nodes in a thread pool
+        self.evaluator = GraphEvaluator(self)
+        self.preview_evaluation = False
+        self.timing_overlay = False
+
+        # Spatial indexes of the node and wire rects
+        # for hit-testing, culling and cutting wires.
+        self.node_index = SpatialGrid()
+        self.wire_index = SpatialGrid()
+
+        # Optional NumPy store of the node rects, see EnableGeometryStore
+        self.geometry = None
+
         self.sel_nodes = []
         self.active_node = None
         self.last_active_node = None
@@ -80,8 +135,52 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.bbox_rect = None
         self.bbox_start = None
 
+        self.active_wire = None
+        self.knife_start = None
+        self.knife_end = None
+
         self.wire_curvature = DEFAULT_WIRE_CURVATURE
 
+        self.culling = True
+        self.culled_count = 0
+
+        # Areas of the window (in window coordinates) which need to be
+        # redrawn on the next call to UpdateDirtyRegions.
+        self.dirty_rects = []
+        self.update_rect = None
+
+        # Redraws requested by mouse events are coalesced and
+        # drawn at most once per timer tick, capped to max_fps.
+        self.max_fps = DEFAULT_MAX_FPS
+        self.redraw_pending = False
+        self.full_redraw_pending = False
+        self.last_frame_time = 0.0
+        self.redraw_timer = wx.Timer(self)
+
+        # Bulk edits in progress, see Batch()
+        self.batch_depth = 0
+        self.batch_selection_changed = False
+        self.batch_connected = {}
+        self.batch_disconnected = {}
+        self.batch_connection_events = False
+
+        # Cached layer of the scene, without the items
+        # which are moving during an interaction.
+        self.static_layer = None
+        self.static_layer_view = None
+        self.dynamic_nodes = None
+        self.dynamic_wires = None
+
+        # Optional cache of pre-rendered node bitmaps
+        self.sprite_cache = None
+
+        # Whether wires are drawn in batches of the same style
+        self.batch_wires = True
+
+        # Zoom levels below which nodes and wires are drawn with less detail
+        self.lod_simple_zoom = LOD_SIMPLE_ZOOM
+        self.lod_minimal_zoom = LOD_MINIMAL_ZOOM
+
         # Init the add node button
         self.addnode_btn = AddNodeBtn(self)
 
@@ -91,10 +190,13 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.Bind(wx.EVT_SIZE, self.OnSize)
         self.Bind(wx.EVT_LEFT_DOWN, self.OnLeftDown)
         self.Bind(wx.EVT_LEFT_UP, self.OnLeftUp)
+        self.Bind(wx.EVT_MOUSE_CAPTURE_LOST, self.OnMouseCaptureLost)
         self.Bind(wx.EVT_MOTION, self.OnMotion)
         self.Bind(wx.EVT_MOUSEWHEEL, self.OnMousewheel)
         self.Bind(wx.EVT_MIDDLE_DOWN, self.OnMiddleDown)
         self.Bind(wx.EVT_MIDDLE_UP, self.OnMiddleUp)
+        self.Bind(wx.EVT_TIMER, self.OnRedrawTimer, self.redraw_timer)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.OnDestroy)
 
         # Context menu bindings
         self.Bind(wx.EVT_CONTEXT_MENU, self.OnContextMenu)
@@ -124,17 +226,46 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.parent.SetAcceleratorTable(self.accel_tbl)
 
     def OnPaint(self, event):
-        dc = wx.BufferedPaintDC(self, self.buffer)
+        dc = wx.PaintDC(self)
+        if self.renderer is not None:
+            self.renderer.Blit(dc, self.GetUpdateRegion().GetBox())
 
     def OnSize(self, event):
-        Size = self.ClientSize
-        self.buffer = wx.Bitmap(*Size)
+        self.CreateRenderer()
         self.UpdateNodeGraph()
 
+    def OnDestroy(self, event):
+        """ Stop the evaluator's threads along with the window. """
+        if event.GetEventObject() is self:
+            self.redraw_timer.Stop()
+            self.evaluator.Shutdown()
+        event.Skip()
+
+    def CreateRenderer(self):
+        """ Create the renderer (and its buffer) for the current size. """
+        if self.renderer is not None:
+            self.renderer.Destroy()
+        self.renderer = GraphRenderer(self.ClientSize, self.antialias)
+        self.buffer = self.renderer.GetBuffer()
+
+    def SetAntialiasing(self, antialias=True):
+        """ Set whether the nodegraph is drawn antialiased. Turning this
+        off draws straight onto the buffer's wx.MemoryDC, which is faster
+        but lower quality. """
+        self.antialias = antialias
+        if self.renderer is not None:
+            self.CreateRenderer()
+            self.UpdateNodeGraph()
+
     def OnLeftDown(self, event):
         pnt = event.GetPosition()
         winpnt = self.CalcMouseCoords(pnt)
 
+        # Keep getting the mouse events until the button is released,
+        # even if that happens outside of the window.
+        if self.HasCapture() is not True:
+            self.CaptureMouse()
+
         # The node has been clicked
         self.src_node = self.HitTest(winpnt)
         if self.src_node is not None:
@@ -145,8 +276,11 @@ class NodeGraphBase(wx.ScrolledCanvas):
             if wx.GetKeyState(wx.WXK_CONTROL) == True:
                 self.SetNodeAsPreview(self.src_node)
 
-            # Handle sockets and wires
+            # Handle sockets and wires. The node may be expanded or
+            # collapsed by the hittest, so refresh it before and after.
+            self.RefreshNode(self.src_node)
             self.src_socket = self.src_node.HitTest(winpnt)
+            self.RefreshNode(self.src_node)
 
             if self.src_socket is not None:
 
@@ -165,11 +299,11 @@ class NodeGraphBase(wx.ScrolledCanvas):
                 # from the output socket
                 elif self.src_socket.direction != SOCKET_OUTPUT:
 
-                    for wire in self.wires:
-                        if wire.dstsocket == self.src_socket:
-                            dst = wire.dstsocket
-                            self.src_socket = wire.srcsocket
-                            self.DisconnectNodes(self.src_socket, dst)
+                    wire = self.input_wires.get(self.src_socket)
+                    if wire is not None:
+                        dst = wire.dstsocket
+                        self.src_socket = wire.srcsocket
+                        self.DisconnectNodes(self.src_socket, dst)
 
                     # Refresh the nodegraph
                     self.UpdateNodeGraph()
@@ -192,31 +326,52 @@ class NodeGraphBase(wx.ScrolledCanvas):
                         self.src_node = self.src_socket.node
 
         else:
-            # Start the box select bbox
-            self.bbox_start = winpnt
-
             self.DeselectNodes()
 
+            if wx.GetKeyState(wx.WXK_ALT) == True:
+                # Start the knife line for cutting wires
+                self.knife_start = winpnt
+            else:
+                # Start the box select bbox
+                self.bbox_start = winpnt
+
+                # Select the wire under the mouse, if there is one
+                self.SetActiveWire(self.WireHitTest(winpnt))
+
             # Update add node button
             pnt = event.GetPosition()
             if self.MouseInAddNodeBtn(pnt) is True:
                 self.addnode_btn.SetClicked(True)
+                self.RefreshWindowRect(self.addnode_btn.GetRect())
 
         self.last_pnt = winpnt
 
-        # Refresh the nodegraph
-        self.UpdateNodeGraph()
+        # Refresh the changed areas of the nodegraph
+        self.UpdateDirtyRegions()
 
     def OnLeftUp(self, event):
         pnt = event.GetPosition()
         winpnt = self.CalcMouseCoords(pnt)
 
+        if self.HasCapture() is True:
+            self.ReleaseMouse()
+
+        # The interaction is over, so go back to drawing everything
+        self.EndInteraction()
+
+        # Cut the wires crossed by the knife line
+        if self.knife_start != None and self.knife_end != None:
+            self.RefreshSceneRect(self.GetKnifeLineRect())
+            self.CutWires(self.knife_start, self.knife_end)
+
         # Clear selection bbox and set nodes as selected
         if self.bbox_rect != None:
+            self.RefreshSceneRect(self.GetSelectionBoxRect())
             self.sel_nodes = self.BoxSelectHitTest(self.bbox_rect)
             for node in self.sel_nodes:
                 if node.IsSelected() != True and node.IsActive() != True:
                     node.SetSelected(True)
+                    self.RefreshNode(node, wires=False)
 
         # Attempt to make a connection
         if self.src_node != None:
@@ -230,7 +385,8 @@ class NodeGraphBase(wx.ScrolledCanvas):
                 if dst_socket is not None:
                     if (self.src_socket.direction != dst_socket.direction
                         and self.src_socket.datatype == dst_socket.datatype
-                        and self.src_node != dst_node):
+                        and self.src_node != dst_node
+                        and self.WouldCreateCycle(self.src_socket, dst_socket) is not True):
 
                         # Only allow a single wire to be connected to any one input.
                         if self.SocketHasWire(dst_socket) is not True:
@@ -241,11 +397,8 @@ class NodeGraphBase(wx.ScrolledCanvas):
                         # disconnect the last connection and
                         # connect the current wire.
                         else:
-                            for wire in self.wires:
-                                if wire.dstsocket == dst_socket:
-                                    dst = wire.dstsocket
-                                    src = wire.srcsocket
-                                    self.DisconnectNodes(src, dst)
+                            wire = self.input_wires[dst_socket]
+                            self.DisconnectNodes(wire.srcsocket, dst_socket)
 
                             self.ConnectNodes(self.src_socket, dst_socket)
 
@@ -258,19 +411,40 @@ class NodeGraphBase(wx.ScrolledCanvas):
 
 
         # Reset all values
+        if self.tmp_wire != None:
+            self.RefreshSceneRect(self.tmp_wire.GetRect())
         self.src_node = None
         self.src_socket = None
         self.tmp_wire = None
         self.bbox_start = None
         self.bbox_rect = None
+        self.knife_start = None
+        self.knife_end = None
 
         # Update add node button and send button event if it was clicked
         pnt = event.GetPosition()
         if self.MouseInAddNodeBtn(pnt) is True:
             self.addnode_btn.SetClicked(False)
+            self.RefreshWindowRect(self.addnode_btn.GetRect())
             self.SendAddNodeBtnEvent()
 
-        # Refresh the nodegraph
+        # Refresh the changed areas of the nodegraph
+        self.UpdateDirtyRegions()
+
+    def OnMouseCaptureLost(self, event):
+        """ Cancel the interaction in progress when the mouse is taken
+        away from the window, e.g: by a popup or another application. """
+        self.EndInteraction()
+
+        self.src_node = None
+        self.src_socket = None
+        self.tmp_wire = None
+        self.bbox_start = None
+        self.bbox_rect = None
+        self.knife_start = None
+        self.knife_end = None
+        self.addnode_btn.SetClicked(False)
+
         self.UpdateNodeGraph()
 
     def OnMotion(self, event):
@@ -280,9 +454,24 @@ class NodeGraphBase(wx.ScrolledCanvas):
         # Draw box selection bbox
         if event.LeftIsDown() is True:
             if self.src_node is None and self.bbox_start != None:
+                if self.dynamic_nodes is None:
+                    self.BeginInteraction()
+                if self.bbox_rect != None:
+                    self.RefreshSceneRect(self.GetSelectionBoxRect())
                 rect = wx.Rect(topLeft=self.bbox_start, bottomRight=winpnt)
                 self.bbox_rect = rect
-                self.UpdateNodeGraph()
+                self.RefreshSceneRect(self.GetSelectionBoxRect())
+                self.RequestRedraw()
+
+            # Draw the knife line
+            elif self.knife_start != None:
+                if self.dynamic_nodes is None:
+                    self.BeginInteraction()
+                if self.knife_end != None:
+                    self.RefreshSceneRect(self.GetKnifeLineRect())
+                self.knife_end = winpnt
+                self.RefreshSceneRect(self.GetKnifeLineRect())
+                self.RequestRedraw()
 
         # If the MMB is down, calculate the scrolling of the graph
         if event.MiddleIsDown() is True and event.Dragging():
@@ -290,29 +479,50 @@ class NodeGraphBase(wx.ScrolledCanvas):
             dy = int(winpnt[1] - self.middle_pnt[1])
             self.ScrollNodeGraph(dx, dy)
             self.ScenePostPan(dx, dy)
-            self.UpdateNodeGraph()
+            self.RequestRedraw(full=True)
 
         if event.LeftIsDown() and self.src_node != None and event.Dragging():
             if self.src_socket is None:
 
                 # Traslating the selected nodes
                 if self.sel_nodes != []:
-                    for node in self.sel_nodes:
-                        dpnt = node.pos + winpnt - self.last_pnt
-                        node.pos = dpnt
+                    moved_nodes = self.sel_nodes
                 else:
                     # Traslating the active node
-                    dpnt = self.src_node.pos + winpnt - self.last_pnt
-                    self.src_node.pos = dpnt
+                    moved_nodes = [self.src_node]
+
+                if self.dynamic_nodes is None:
+                    self.BeginInteraction(moved_nodes)
+
+                # Only the wires connected to the moved nodes move with
+                # them, these were found when the interaction began.
+                moved_wires = self.dynamic_wires
+
+                # The areas the nodes and wires are moving from
+                self.RefreshNodesAndWires(moved_nodes, moved_wires)
+
+                delta = winpnt - self.last_pnt
+                if self.geometry is not None:
+                    # Move all of the nodes at once in the geometry store
+                    self.geometry.Translate(moved_nodes, delta[0], delta[1])
+                    for node in moved_nodes:
+                        self.UpdateNodeIndex(node)
+                else:
+                    for node in moved_nodes:
+                        node.pos = node.pos + delta
 
                 self.last_pnt = winpnt
 
-                # Redraw the wires
-                for wire in self.wires:
-                    wire.pnt1 = wire.srcnode.pos + wire.srcsocket.pos
-                    wire.pnt2 = wire.dstnode.pos + wire.dstsocket.pos
+                for wire in moved_wires:
+                    self.UpdateWirePosition(wire)
+
+                # The areas the nodes and wires have moved to
+                self.RefreshNodesAndWires(moved_nodes, moved_wires)
 
             elif self.tmp_wire != None:
+                if self.dynamic_nodes is None:
+                    self.BeginInteraction()
+                self.RefreshSceneRect(self.tmp_wire.GetRect())
 
                 # Set the wire to be active when it is being edited.
                 self.tmp_wire.active = True
@@ -320,18 +530,30 @@ class NodeGraphBase(wx.ScrolledCanvas):
                 if winpnt != None:
                     self.tmp_wire.pnt2 = winpnt
 
-            self.UpdateNodeGraph()
+                self.RefreshSceneRect(self.tmp_wire.GetRect())
+
+            self.RequestRedraw()
 
         else:
+            # Only redraw on hover if the add node button changed state
             pnt = event.GetPosition()
             if self.addnode_btn.IsClicked() is not True:
-                if self.MouseInAddNodeBtn(pnt) is True:
-                    self.addnode_btn.SetFocused(True)
-                else:
-                    self.addnode_btn.SetFocused(False)
-            self.UpdateNodeGraph()
+                focused = self.MouseInAddNodeBtn(pnt)
+                if focused != self.addnode_btn.IsFocused():
+                    self.addnode_btn.SetFocused(focused)
+                    self.RefreshWindowRect(self.addnode_btn.GetRect())
+                    self.RequestRedraw()
 
     def OnDeleteNodes(self, event):
+        # A selected wire is deleted by disconnecting it,
+        # unless there are nodes selected as well.
+        if (self.active_wire is not None and self.sel_nodes == []
+            and self.active_node is None):
+            wire = self.active_wire
+            self.SetActiveWire(None)
+            self.DisconnectNodes(wire.srcsocket, wire.dstsocket)
+            self.UpdateDirtyRegions()
+            return
         self.DeleteNodes()
 
     def OnDeleteNode(self, event):
@@ -438,9 +660,9 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.context_menu.AppendItem(deselectallnodes_menuitem)
 
     def DrawSelectionBox(self, dc, rect):
-        dc.SetPen(wx.Pen(wx.Colour(SELECTION_BOX_BORDER_COLOR), 2,
-                  wx.PENSTYLE_SHORT_DASH))
-        dc.SetBrush(wx.Brush(wx.Colour(SELECTION_BOX_COLOR)))
+        dc.SetPen(self.resources.GetPen(SELECTION_BOX_BORDER_COLOR, 2,
+                                        wx.PENSTYLE_SHORT_DASH))
+        dc.SetBrush(self.resources.GetBrush(SELECTION_BOX_COLOR))
         dc.DrawRectangle(rect)
 
     def SetZoomLevel(self, zoom, x=0, y=0):
@@ -455,10 +677,10 @@ class NodeGraphBase(wx.ScrolledCanvas):
         rotation = event.GetWheelRotation()
         mouse = event.GetPosition()
 
-        if rotation > 1 and self.zoom < 310:
+        if rotation > 1 and self.zoom < MOUSEWHEEL_MAX_ZOOM:
             self.ScenePostScale(1.1, 1.1, mouse[0], mouse[1])
 
-        elif rotation < -1 and self.zoom > 60:
+        elif rotation < -1 and self.zoom > MOUSEWHEEL_MIN_ZOOM:
             self.ScenePostScale(0.9, 0.9, mouse[0], mouse[1])
 
         self.UpdateZoomValue()
@@ -481,6 +703,12 @@ class NodeGraphBase(wx.ScrolledCanvas):
     def GetNodes(self):
         return self.nodes
 
+    @property
+    def wires(self) -> list:
+        """ List of the wires, in the order they were connected. This is
+        a copy, so use ConnectNodes and DisconnectNodes to change it. """
+        return list(self._wires)
+
     def UpdateZoomValue(self):
         self.zoom = round(self.GetScaleX() * 100)
 
@@ -521,49 +749,459 @@ class NodeGraphBase(wx.ScrolledCanvas):
         rgn.Offset(x, y)
         return rgn.GetBox()
 
+    def SetMaxFPS(self, fps):
+        """ Set the maximum number of times per second that the nodegraph
+        is redrawn in response to mouse movement. Pass 0 for no limit. """
+        self.max_fps = fps
+
+    def RequestRedraw(self, full=False):
+        """ Ask for the nodegraph to be redrawn soon. Requests made before
+        the next timer tick are coalesced into a single redraw, and redraws
+        are spaced out to stay within the max_fps limit.
+
+        :param full: redraw everything rather than only the dirty areas
+        """
+        if full is True:
+            self.full_redraw_pending = True
+        elif self.dirty_rects == []:
+            # Nothing has changed
+            return
+        self.redraw_pending = True
+
+        if self.batch_depth > 0 or self.redraw_timer.IsRunning():
+            return
+
+        delay = 0.0
+        if self.max_fps > 0:
+            elapsed = time.perf_counter() - self.last_frame_time
+            delay = (1.0 / self.max_fps) - elapsed
+        self.redraw_timer.StartOnce(max(1, int(delay * 1000)))
+
+    def OnRedrawTimer(self, event):
+        if self.full_redraw_pending is True:
+            self.UpdateNodeGraph()
+        elif self.redraw_pending is True:
+            self.UpdateDirtyRegions()
+
+    @contextlib.contextmanager
+    def Batch(self, connection_events=False):
+        """ Context manager for making many changes to the nodegraph at
+        once, e.g: building a graph from code. Redraws are deferred and the
+        select, connect and disconnect events are collected into a single
+        EVT_GSNODEGRAPH_BATCHEDIT event, both of which happen when the
+        outermost batch ends. Batches can be nested.
+
+        with nodegraph.Batch():
+            node1 = nodegraph.AddNode("image_nodeid", pos=(100, 100))
+            node2 = nodegraph.AddNode("output_nodeid", pos=(400, 100))
+            nodegraph.ConnectNodes(node1.GetSockets()[0], node2.GetSockets()[0])
+
+        :param connection_events: if True, a connect or disconnect event
+        is also sent for each of the connections in the summary event
+        """
+        self.BeginBatch(connection_events)
+        try:
+            yield self
+        finally:
+            self.EndBatch()
+
+    def BeginBatch(self, connection_events=False):
+        """ Start a batch of changes. Every call must be matched by a call
+        to EndBatch, prefer using Batch() which takes care of this. """
+        self.batch_depth += 1
+        if connection_events is True:
+            self.batch_connection_events = True
+
+    def EndBatch(self):
+        """ End a batch of changes. When the outermost batch ends the
+        nodegraph is redrawn and the summary event is sent. """
+        if self.batch_depth == 0:
+            raise RuntimeError("EndBatch called without a matching BeginBatch")
+
+        self.batch_depth -= 1
+        if self.batch_depth > 0:
+            return
+
+        connected = list(self.batch_connected)
+        disconnected = list(self.batch_disconnected)
+        if (self.batch_selection_changed is True
+            or connected != [] or disconnected != []):
+            self.SendBatchEditEvent(self.batch_selection_changed,
+                                    connected, disconnected)
+        connection_events = self.batch_connection_events
+        self.batch_selection_changed = False
+        self.batch_connected = {}
+        self.batch_disconnected = {}
+        self.batch_connection_events = False
+
+        if connection_events is True:
+            for connection in disconnected:
+                self.SendNodeDisconnectEvent([connection])
+            for connection in connected:
+                self.SendNodeConnectEvent([connection])
+
+        if self.full_redraw_pending is True or self.redraw_pending is True:
+            self.UpdateNodeGraph()
+
+    def IsBatching(self) -> bool:
+        """ Whether a batch of changes is in progress. """
+        return self.batch_depth > 0
+
     def UpdateNodeGraph(self):
-        dc = wx.MemoryDC()
-        dc.SelectObject(self.buffer)
-        dc = wx.GCDC(dc)
-        self.OnDrawBackground(dc)
-        dc.SetTransformMatrix(self.matrix)
-        self.OnDrawScene(dc)
+        """ Redraw the whole nodegraph. """
+        if self.batch_depth > 0:
+            # Deferred until the batch ends
+            self.full_redraw_pending = True
+            return
+
+        # Everything is redrawn, so any pending dirty areas are handled too.
+        self.dirty_rects = []
+        self.update_rect = None
+        self.redraw_pending = False
+        self.full_redraw_pending = False
+        self.last_frame_time = time.perf_counter()
+        if self.renderer is None:
+            return
+
+        # Anything may have changed, including the items in the static layer
+        self.InvalidateStaticLayer()
+
+        dc = self.renderer.BeginFrame()
+        self.DrawFrame(dc)
+        self.renderer.EndFrame()
+        self.Refresh(eraseBackground=False)
+        self.Update()
+
+    def UpdateDirtyRegions(self):
+        """ Redraw only the areas of the nodegraph which have been marked
+        as changed with the Refresh*Rect methods since the last update. """
+        if self.batch_depth > 0:
+            self.redraw_pending = True
+            return
+
+        self.redraw_pending = False
+        if self.dirty_rects == [] or self.buffer is None:
+            return
+        self.last_frame_time = time.perf_counter()
+
+        rect = wx.Rect(self.dirty_rects[0])
+
+        for dirty_rect in self.dirty_rects[1:]:
+            rect = rect.Union(dirty_rect)
+        self.dirty_rects = []
+
+        rect = rect.Intersect(wx.Rect(0, 0, self.buffer.Width, self.buffer.Height))
+        if rect.IsEmpty():
+            return
+
+        # The background is cleared and the items are redrawn clipped to
+        # the changed area, so the rest of the buffer stays untouched.
+        self.update_rect = rect
+        dc = self.renderer.BeginFrame(rect)
+        self.DrawFrame(dc)
+        self.renderer.EndFrame()
+        self.update_rect = None
+
+        self.RefreshRect(rect, eraseBackground=False)
+        self.Update()
+
+    def DrawFrame(self, dc):
+        """ Draw the background, the scene and the interface. While an
+        interaction is in progress, the static part of the scene is drawn
+        from the cached layer and only the moving items are drawn. """
+        if self.dynamic_nodes is not None:
+            if self.static_layer_view != self.GetViewKey():
+                self.RenderStaticLayer()
+            dc.DrawBitmap(self.static_layer, 0, 0, useMask=False)
+            dc.SetTransformMatrix(self.matrix)
+            self.OnDrawDynamicScene(dc)
+        else:
+            self.OnDrawBackground(dc)
+            dc.SetTransformMatrix(self.matrix)
+            self.OnDrawScene(dc)
         dc.SetTransformMatrix(self.identity)
         self.OnDrawInterface(dc)
-        del dc  # need to get rid of the MemoryDC before Update() is called.
-        self.Refresh()
-        self.Update()
+
+    def BeginInteraction(self, nodes=()):
+        """ Start caching the static part of the scene, which is everything
+        except the given (moving) nodes and the wires connected to them,
+        as a layer. Until EndInteraction is called, each frame only draws
+        the moving items over the cached layer.
+
+        :param nodes: list of the nodes which are being moved
+        """
+        self.dynamic_nodes = list(nodes)
+        self.dynamic_wires = self.GetNodesWires(self.dynamic_nodes)
+        self.RenderStaticLayer()
+
+    def EndInteraction(self):
+        """ Stop drawing from the cached static layer. """
+        self.static_layer = None
+        self.static_layer_view = None
+        self.dynamic_nodes = None
+        self.dynamic_wires = None
+
+    def InvalidateStaticLayer(self):
+        """ Make the next frame of the interaction in progress render
+        the static layer again, e.g: after nodes or wires were changed
+        by something other than the interaction itself. """
+        if self.dynamic_nodes is None:
+            return
+
+        # The moving nodes may have been deleted or rewired meanwhile
+        self.dynamic_nodes = [node for node in self.dynamic_nodes
+                              if self.nodes.get(node.id) is node]
+        self.dynamic_wires = self.GetNodesWires(self.dynamic_nodes)
+        self.static_layer_view = None
+
+    def GetViewKey(self):
+        """ Get the values that decide where the scene is drawn in the buffer. """
+        matrix, translation = self.matrix.Get()
+        return (matrix.m_11, matrix.m_12, matrix.m_21, matrix.m_22,
+                translation.x, translation.y,
+                self.buffer.Width, self.buffer.Height)
+
+    def RenderStaticLayer(self):
+        """ Render the background and the items which are not
+        moving during the interaction into the static layer. """
+        # The layer is always rendered whole, even during a partial update
+        update_rect = self.update_rect
+        self.update_rect = None
+
+        self.static_layer = wx.Bitmap(self.buffer.Width, self.buffer.Height)
+        memdc = wx.MemoryDC()
+        memdc.SelectObject(self.static_layer)
+        dc = self.renderer.CreateDC(memdc)
+        self.OnDrawBackground(dc)
+        dc.SetTransformMatrix(self.matrix)
+        self.OnDrawStaticScene(dc)
+        del dc
+        memdc.SelectObject(wx.NullBitmap)
+
+        self.static_layer_view = self.GetViewKey()
+        self.update_rect = update_rect
+
+    def RefreshWindowRect(self, rect):
+        """ Mark an area of the window as needing to be redrawn.
+
+        :param rect: wx.Rect in window coordinates
+        """
+        if self.batch_depth > 0:
+            # The whole nodegraph is redrawn once the batch ends
+            self.full_redraw_pending = True
+            return
+
+        # Extra padding covers antialiasing around the edges
+        self.dirty_rects.append(wx.Rect(rect).Inflate(2, 2))
+
+    def RefreshSceneRect(self, rect):
+        """ Mark an area of the scene as needing to be redrawn.
+
+        :param rect: wx.Rect in scene coordinates
+        """
+        self.RefreshWindowRect(self.ConvertSceneRectToWindow(rect))
+
+    def RefreshNodesAndWires(self, nodes, wires):
+        """ Mark the areas of the given nodes and wires as needing to be
+        redrawn. Unlike calling RefreshNode for each of the nodes, a wire
+        between two of the nodes is only refreshed once. """
+        for node in nodes:
+            self.RefreshSceneRect(node.GetPaintRect())
+        for wire in wires:
+            self.RefreshSceneRect(wire.GetRect())
+
+    def RefreshNode(self, node, wires=True):
+        """ Mark the area of the given node, and optionally the wires
+        connected to it, as needing to be redrawn. """
+        self.RefreshSceneRect(node.GetPaintRect())
+        if wires is True:
+            for wire in self.node_wires.get(node, {}):
+                self.RefreshSceneRect(wire.GetRect())
 
     def OnDrawBackground(self, dc):
-        dc.SetBackground(wx.Brush(wx.Colour(GRAPH_BACKGROUND_COLOR)))
+        dc.SetBackground(self.resources.GetBrush(GRAPH_BACKGROUND_COLOR))
         dc.Clear()
 
     def OnDrawScene(self, dc):
-        # Draw background
-        if self.bg_img != None:
-            image = self.bg_img
+        self.DrawBackgroundImage(dc)
 
-            x = int(self.GetSize()[0]/2.0 - image.Width/2.0)
-            y = int(self.GetSize()[1]/2.0 - image.Height/2.0)
-            pnt = self.ConvertCoords(wx.Point(x, y))
-            dc.DrawBitmap(image, pnt[0], pnt[1], useMask=False)
+        self.culled_count = 0
+        view_rect = self.GetCullingRect()
 
         # Draw nodes
-        for node_id in self.nodes:
-            self.nodes[node_id].Draw(dc)
+        self.DrawNodes(dc, self.GetNodesInRect(view_rect), view_rect)
 
         # Draw temporary wires
         if self.tmp_wire != None:
             self.tmp_wire.Draw(dc)
 
         # Draw wires
-        for wire in self.wires:
-            wire.Draw(dc)
+        self.DrawWires(dc, self.GetWiresInRect(view_rect))
 
         # Draw selection box
         if self.bbox_start != None and self.bbox_rect != None:
             self.DrawSelectionBox(dc, self.bbox_rect)
 
+        # Draw knife line
+        if self.knife_start != None and self.knife_end != None:
+            self.DrawKnifeLine(dc)
+
+    def OnDrawStaticScene(self, dc):
+        """ Draw the part of the scene which does not
+        change during the current interaction. """
+        self.DrawBackgroundImage(dc)
+
+        self.culled_count = 0
+        view_rect = self.GetCullingRect()
+
+        dynamic_nodes = set(self.dynamic_nodes)
+        nodes = [node for node in self.GetNodesInRect(view_rect)
+                 if node not in dynamic_nodes]
+        self.DrawNodes(dc, nodes, view_rect)
+
+        dynamic_wires = set(self.dynamic_wires)
+        wires = [wire for wire in self.GetWiresInRect(view_rect)
+                 if wire not in dynamic_wires]
+        self.DrawWires(dc, wires)
+
+    def OnDrawDynamicScene(self, dc):
+        """ Draw the part of the scene which changes
+        during the current interaction. """
+        self.culled_count = 0
+        view_rect = self.GetCullingRect()
+
+        self.DrawNodes(dc, self.dynamic_nodes, view_rect)
+
+        if self.tmp_wire != None:
+            self.tmp_wire.Draw(dc)
+
+        self.DrawWires(dc, self.CullWires(self.dynamic_wires, view_rect))
+
+        if self.bbox_start != None and self.bbox_rect != None:
+            self.DrawSelectionBox(dc, self.bbox_rect)
+
+        if self.knife_start != None and self.knife_end != None:
+            self.DrawKnifeLine(dc)
+
+    def DrawBackgroundImage(self, dc):
+        if self.bg_img != None:
+            image = self.bg_img
+
+            x = int(self.GetSize()[0]/2.0 - image.Width/2.0)
+            y = int(self.GetSize()[1]/2.0 - image.Height/2.0)
+            pnt = self.ConvertCoords(wx.Point(x, y))
+            dc.DrawBitmap(image, pnt[0], pnt[1], useMask=False)
+
+    def GetCullingRect(self):
+        """ Get the area of the scene which items need to be inside of
+        to be drawn, or None if everything should be drawn. This is the
+        area being updated, or otherwise the visible area. """
+        if self.update_rect is not None:
+            return self.ConvertWindowRectToScene(self.update_rect)
+        elif self.culling is True:
+            return self.GetVisibleSceneRect()
+        return None
+
+    def GetNodesInRect(self, rect):
+        """ Get the nodes which paint inside of the given scene rect
+        (or all of the nodes if it is None), using the node index. """
+        if rect is None:
+            return list(self.nodes.values())
+
+        # The node paint rect is larger than the indexed node rect
+        # because of the sockets sticking out over the edges.
+        margin = SOCKET_RADIUS + 1
+        nodes = self.QueryNodesInRect((rect[0] - margin, rect[1] - margin,
+                                       rect[2] + margin * 2, rect[3] + margin * 2))
+        self.culled_count += len(self.nodes) - len(nodes)
+        return nodes
+
+    def DrawNodes(self, dc, nodes, view_rect):
+        """ Draw the given nodes, skipping those outside of view_rect. """
+        for node in nodes:
+            if view_rect is not None and not view_rect.Intersects(node.GetPaintRect()):
+                self.culled_count += 1
+                continue
+            node.Draw(dc)
+
+    def GetWiresInRect(self, rect):
+        """ Get the wires which are inside of the given scene rect
+        (or all of the wires if it is None), using the wire index. """
+        if rect is None:
+            return list(self._wires)
+
+        wires = self.wire_index.QueryRect(rect)
+        self.culled_count += len(self._wires) - len(wires)
+        return wires
+
+    def CullWires(self, wires, view_rect):
+        """ Get the given wires, except for those outside of view_rect. """
+        if view_rect is None:
+            return list(wires)
+
+        visible_wires = []
+        for wire in wires:
+            if view_rect.Intersects(wire.GetRect()):
+                visible_wires.append(wire)
+            else:
+                self.culled_count += 1
+        return visible_wires
+
+    def DrawWires(self, dc, wires):
+        """ Draw the given wires. If possible, the wires are grouped by
+        their style and each group is stroked as a single path, so the
+        number of draw calls depends on the number of styles rather than
+        the number of wires. """
+        gc = dc.GetGraphicsContext()
+        if self.batch_wires is not True or gc is None:
+            for wire in wires:
+                wire.Draw(dc)
+            return
+
+        paths = {}
+        for wire in wires:
+            style = wire.GetStyle()
+            path = paths.get(style)
+            if path is None:
+                path = gc.CreatePath()
+                paths[style] = path
+            wire.AddToPath(path)
+
+        for (color, width), path in paths.items():
+            gc.SetPen(self.resources.GetPen(color, width))
+            gc.StrokePath(path)
+
+    def DrawKnifeLine(self, dc):
+        dc.SetPen(self.resources.GetPen(KNIFE_LINE_COLOR, 2,
+                                        wx.PENSTYLE_SHORT_DASH))
+        dc.DrawLine(self.knife_start[0], self.knife_start[1],
+                    self.knife_end[0], self.knife_end[1])
+
+    def GetKnifeLineRect(self):
+        """ Get the area painted by the knife line.
+
+        :returns: wx.Rect in scene coordinates
+        """
+        return self.GetLineRect(self.knife_start, self.knife_end).Inflate(2, 2)
+
+    def GetLineRect(self, pnt1, pnt2):
+        """ Get the bounding rect of the line between the two points. """
+        x = min(pnt1[0], pnt2[0])
+        y = min(pnt1[1], pnt2[1])
+        return wx.Rect(x, y, abs(pnt2[0] - pnt1[0]) + 1, abs(pnt2[1] - pnt1[1]) + 1)
+
+    def SetWireBatching(self, batch=True):
+        """ Set whether wires of the same style should be drawn
+        together as a single path. """
+        self.batch_wires = batch
+
+    def GetSelectionBoxRect(self):
+        """ Get the area painted by the selection box, including its border.
+
+        :returns: wx.Rect in scene coordinates
+        """
+        return wx.Rect(self.bbox_rect).Inflate(2, 2)
+
     def OnDrawInterface(self, dc):
         # Calculate the position and draw the add node button
         padding = 10
@@ -572,41 +1210,125 @@ class NodeGraphBase(wx.ScrolledCanvas):
         pnt = self.ConvertCoords(wx.Point(x, y))
         self.addnode_btn.Draw(dc, pnt)
 
+    def GetVisibleSceneRect(self):
+        """ Get the area of the scene which is currently visible
+        in the window, taking into account the zoom and panning.
+
+        :returns: wx.Rect in scene coordinates
+        """
+        w, h = self.ClientSize
+        return self.ConvertWindowRectToScene(wx.Rect(0, 0, w, h))
+
+    def SetCulling(self, culling=True):
+        """ Set whether nodes and wires outside of the visible
+        area of the scene should be skipped when drawing. """
+        self.culling = culling
+
+    def GetCulledCount(self):
+        """ Get the number of nodes and wires which were skipped
+        when the last frame was drawn. """
+        return self.culled_count
+
+    def EnableSpriteCache(self, enable=True, budget=SPRITE_CACHE_BUDGET):
+        """ Set whether nodes should be drawn from cached, pre-rendered
+        bitmaps instead of being drawn from scratch every frame.
+
+        :param enable: whether to use the sprite cache
+        :param budget: maximum memory used by the cached bitmaps in bytes
+        """
+        if enable is True:
+            if self.sprite_cache is None:
+                self.sprite_cache = NodeSpriteCache(budget)
+            else:
+                self.sprite_cache.SetBudget(budget)
+        else:
+            self.sprite_cache = None
+
+    def GetSpriteCache(self):
+        return self.sprite_cache
+
+    def EnableGeometryStore(self, enable=True):
+        """ Set whether the positions and sizes of the nodes are kept in
+        NumPy arrays, so that moving many nodes, box selection, culling
+        and framing the nodes are vectorized. This needs NumPy.
+
+        :param enable: whether to use the geometry store
+        :returns: whether the geometry store is in use
+        """
+        if enable is True:
+            if self.geometry is None and HasNumPy():
+                self.geometry = NodeGeometry()
+                for node in self.nodes.values():
+                    node.AttachGeometry()
+        elif self.geometry is not None:
+            for node in self.nodes.values():
+                node.DetachGeometry()
+            self.geometry = None
+        return self.geometry is not None
+
+    def GetGeometryStore(self):
+        return self.geometry
+
+    def SetLevelOfDetailThresholds(self, simple_zoom, minimal_zoom):
+        """ Set the zoom levels (in percent) below which the nodegraph is
+        drawn with less detail. Below ``simple_zoom``, nodes are drawn as
+        plain rectangles with their sockets as dots and wires are drawn as
+        straight lines. Below ``minimal_zoom``, the sockets are hidden too.
+        Pass 0 for both to always draw with full detail.
+        """
+        self.lod_simple_zoom = simple_zoom
+        self.lod_minimal_zoom = minimal_zoom
+
+    def GetLevelOfDetail(self):
+        """ Get the level of detail (``LOD_FULL``, ``LOD_SIMPLE`` or
+        ``LOD_MINIMAL``) to draw with at the current zoom level. """
+        if self.zoom < self.lod_minimal_zoom:
+            return LOD_MINIMAL
+        elif self.zoom < self.lod_simple_zoom:
+            return LOD_SIMPLE
+        return LOD_FULL
+
     def SetNodeWireCurvature(self, curvature):
         self.wire_curvature = curvature
 
         # Change existing wires
-        for wire in self.wires:
+        for wire in self._wires:
             wire.SetCurvature(curvature)
+            self.wire_index.Update(wire, wire.GetRect())
 
     def SetBackgroundImage(self, image):
         self.bg_img = image
 
     def HandleNodeSelection(self):
+        # Selecting a node deselects the wire
+        self.SetActiveWire(None)
+
         # Set the active node
         if self.active_node is None:
             self.active_node = self.src_node
             self.active_node.SetActive(True)
+            self.RefreshNode(self.active_node, wires=False)
 
         else:
             # We check to make sure this is not just the same
             # node clicked again, then we switch the active states.
             if self.src_node != self.active_node:
                 self.active_node.SetActive(False)
+                self.RefreshNode(self.active_node, wires=False)
                 self.active_node = self.src_node
                 self.active_node.SetActive(True)
+                self.RefreshNode(self.active_node, wires=False)
 
         # When a node is active, all the selected nodes
         # need to be set to the unselected state.
         if self.sel_nodes != []:
-            [node.SetSelected(False) for node in self.sel_nodes]
+            for node in self.sel_nodes:
+                node.SetSelected(False)
+                self.RefreshNode(node, wires=False)
 
     def BoxSelectHitTest(self, bboxrect):
         """ Hit-test for box selection. """
-        nodehits = []
-        for node in self.nodes.values():
-            if bboxrect.Intersects(node.GetRect()) == True:
-                nodehits.append(node)
+        nodehits = self.QueryNodesInRect(bboxrect)
 
         if nodehits != []:
             return nodehits
@@ -616,26 +1338,92 @@ class NodeGraphBase(wx.ScrolledCanvas):
 
     def DeselectNodes(self):
         """ Deselect everything that is selected or active. """
-        [node.SetSelected(False) for node in self.sel_nodes]
+        self.SetActiveWire(None)
+
+        for node in self.sel_nodes:
+            node.SetSelected(False)
+            self.RefreshNode(node, wires=False)
 
         self.sel_nodes = []
 
         if self.active_node != None:
             self.active_node.SetActive(False)
+            self.RefreshNode(self.active_node, wires=False)
             self.active_node = None
 
     def HitTest(self, pnt):
-        mouse_rect = wx.Rect(pnt[0], pnt[1], 2, 2)
+        # Inflate the rect so that the node sockets are
+        # highly sensitive to clicks for easier connections.
+        mouse_rect = wx.Rect(pnt[0], pnt[1], 2, 2).Inflate(7, 7)
 
-        for node in self.nodes:
-            # Inflate the rect so that the node sockets are
-            # highly sensitive to clicks for easier connections.
-            node_rect = self.nodes[node].GetRect().Inflate(7, 7)
-            if mouse_rect.Intersects(node_rect):
-                return self.nodes[node]
+        nodehits = self.node_index.QueryRect(mouse_rect)
+        if nodehits != []:
+            return nodehits[0]
+
+    def WireHitTest(self, pnt, tolerance=WIRE_HIT_TOLERANCE):
+        """ Get the wire nearest to the point, measured along its curve,
+        if it is within the tolerance. Otherwise returns None. """
+        rect = (pnt[0] - tolerance, pnt[1] - tolerance,
+                tolerance * 2 + 1, tolerance * 2 + 1)
+        nearest_wire = None
+        nearest_distance = tolerance
+        for wire in self.wire_index.QueryRect(rect):
+            distance = wire.GetDistance(pnt)
+            if distance <= nearest_distance:
+                nearest_wire = wire
+                nearest_distance = distance
+        return nearest_wire
+
+    def CutWires(self, pnt1, pnt2):
+        """ Disconnect every wire crossed by the line between the two
+        points. A single disconnect event is sent for all of them.
+
+        :returns: list of the wires which were cut
+        """
+        rect = self.GetLineRect(pnt1, pnt2)
+        wires = [wire for wire in self.wire_index.QueryRect(rect)
+                 if wire.IntersectsLine(pnt1, pnt2)]
 
-        # Refresh the nodegraph
-        self.UpdateNodeGraph()
+        connections = []
+        for wire in wires:
+            if wire is self.active_wire:
+                self.SetActiveWire(None)
+            connections.append((wire.srcsocket, wire.dstsocket))
+            self.DisconnectNodes(wire.srcsocket, wire.dstsocket, notify=False)
+
+        if connections != []:
+            self.SendNodeDisconnectEvent(connections)
+        return wires
+
+    def SetActiveWire(self, wire):
+        """ Set the wire which is selected, or None to deselect it. """
+        if self.active_wire is not None:
+            self.active_wire.active = False
+            self.RefreshSceneRect(self.active_wire.GetRect())
+        self.active_wire = wire
+        if wire is not None:
+            wire.active = True
+            self.RefreshSceneRect(wire.GetRect())
+
+    def UpdateWirePosition(self, wire):
+        """ Move the ends of the wire to the sockets it connects. """
+        wire.pnt1 = wire.srcnode.pos + wire.srcsocket.pos
+        wire.pnt2 = wire.dstnode.pos + wire.dstsocket.pos
+        if wire in self.wire_index:
+            self.wire_index.Update(wire, wire.GetRect())
+
+    def QueryNodesInRect(self, rect):
+        """ Get the nodes whose rects intersect the given scene rect, using
+        the geometry store if it is enabled, otherwise the node index. """
+        if self.geometry is not None:
+            return self.geometry.QueryRect(rect)
+        return self.node_index.QueryRect(rect)
+
+    def UpdateNodeIndex(self, node):
+        """ Update the rect of the node in the node index after
+        its position or size has changed. """
+        if node in self.node_index:
+            self.node_index.Update(node, node.GetRect())
 
     def MouseInAddNodeBtn(self, pnt):
         mouse_rect = wx.Rect(pnt[0], pnt[1], 1, 1)
@@ -650,26 +1438,26 @@ class NodeGraphBase(wx.ScrolledCanvas):
         """ Delete the currently selected nodes. This will refuse
         to delete the Output Composite node though, for obvious reasons.
         """
-        for node in self.sel_nodes:
-            if node.IsOutputNode() != True:
-                self.DeleteNode(node)
-            else:
-                # In the case that this is an output node, we
-                # want to deselect it, not delete it. :)
-                node.SetSelected(False)
-        self.sel_nodes = []
+        with self.Batch():
+            for node in self.sel_nodes:
+                if node.IsOutputNode() != True:
+                    self.DeleteNode(node)
+                else:
+                    # In the case that this is an output node, we
+                    # want to deselect it, not delete it. :)
+                    node.SetSelected(False)
+                    self.RefreshNode(node, wires=False)
+            self.sel_nodes = []
 
-        if (self.active_node != None and
-            self.active_node.IsOutputNode() != True):
-            self.DeleteNode(self.active_node)
-            self.active_node = None
+            if (self.active_node != None and
+                self.active_node.IsOutputNode() != True):
+                self.DeleteNode(self.active_node)
+                self.active_node = None
 
         # Update the properties panel so that the deleted
         # nodes' properties are not still shown!
         self.SendNodeSelectEvent()
 
-        self.UpdateNodeGraph()
-
     def DuplicateNode(self, node):
         """ Duplicates the given ``Node`` object with its properties.
         :param node: the ``Node`` object to duplicate
@@ -696,6 +1484,11 @@ class NodeGraphBase(wx.ScrolledCanvas):
             node.pos = self.CalcMouseCoords(self.ScreenToClient(wx.GetMousePosition()))
         else:
             node.pos = wx.Point(pos[0], pos[1])
+        if self.geometry is not None:
+            node.AttachGeometry()
+        self.node_index.Insert(node, node.GetRect())
+        self.topo_order.AddNode(node)
+        self.MarkDirty(node)
         return node
 
     def IsInputNode(self, node) -> bool:
@@ -705,10 +1498,212 @@ class NodeGraphBase(wx.ScrolledCanvas):
             return False
 
     def SocketHasWire(self, dst_socket):
-        for wire in self.wires:
-            if wire.dstsocket == dst_socket:
-                return True
-        return False
+        return dst_socket in self.input_wires
+
+    def GetInputWire(self, dst_socket):
+        """ Get the wire connected to the input socket, or None. """
+        return self.input_wires.get(dst_socket)
+
+    def GetOutputWires(self, src_socket):
+        """ Get the list of wires connected to the output socket. """
+        return list(self.output_wires.get(src_socket, {}))
+
+    def GetNodesWires(self, nodes):
+        """ Get the list of the wires connected to any of the given nodes,
+        each wire only once, looked up in the node wire index. """
+        wires = {}
+        for node in nodes:
+            wires.update(self.node_wires.get(node, {}))
+        return list(wires)
+
+    def GetNodeWires(self, node):
+        """ Get the list of wires connected to any socket of the node. """
+        return list(self.node_wires.get(node, {}))
+
+    def GetWire(self, src_socket, dst_socket):
+        """ Get the wire connecting the two sockets, or None. """
+        return self.connections.get((src_socket, dst_socket))
+
+    def WouldCreateCycle(self, src_socket, dst_socket) -> bool:
+        """ Whether connecting the two sockets would make a node
+        depend on its own output. The sockets may be given in
+        either order. """
+        if src_socket.direction != SOCKET_OUTPUT:
+            src_socket, dst_socket = dst_socket, src_socket
+        return self.topo_order.WouldCreateCycle(src_socket.node, dst_socket.node)
+
+    def GetEvaluator(self):
+        return self.evaluator
+
+    def EvaluateGraph(self, node=None, context=None):
+        """ Evaluate the given node, by default the output node, in the
+        background. The result is sent with an EVT_GSNODEGRAPH_EVALUATED
+        event, see ``GraphEvaluator.EvaluateAsync``. """
+        self.evaluator.EvaluateAsync(node, context)
+
+    def EnablePreviewEvaluation(self, enable=True):
+        """ Enable progressive evaluation of the output node whenever it,
+        or anything upstream of it, changes: e.g: after SetNodeAsPreview
+        or NotifyPropertyChanged. See ``GraphEvaluator.EvaluatePreview``.
+        """
+        self.preview_evaluation = enable
+        if enable is not True:
+            self.evaluator.CancelPreview()
+
+    def RequestPreview(self):
+        """ Start a progressive evaluation of the output node shortly,
+        cancelling the one in progress. """
+        if self.preview_evaluation is True:
+            self.evaluator.EvaluatePreview()
+
+    def SetTimingOverlay(self, show=True):
+        """ Show how long each node took to evaluate. Node headers are
+        tinted from their usual color towards red by their share of the
+        total time, and show their total time and share of the total. """
+        self.timing_overlay = show
+        self.UpdateNodeGraph()
+
+    def IsTimingOverlayShown(self) -> bool:
+        return self.timing_overlay
+
+    def RefreshTimingOverlay(self):
+        """ Redraw the nodes with the latest timings, if they are shown. """
+        if self.timing_overlay is True:
+            self.UpdateNodeGraph()
+
+    def InvalidateResults(self, node):
+        """ Throw away the cached evaluation results of the
+        node and of every node which depends on it. """
+        cache = self.evaluator.GetResultCache()
+        cache.Invalidate(node)
+        for downstream_node in self.topo_order.GetDownstream(node):
+            cache.Invalidate(downstream_node)
+
+    def MarkDirty(self, node):
+        """ Mark the node, and so every node which depends on it, as
+        needing to be evaluated again. Only the node itself is recorded,
+        the nodes depending on it are found when they are asked for (see
+        GetDirtyNodes) so that connecting many nodes stays cheap. """
+        if node not in self.topo_order:
+            return
+        self.dirty_version += 1
+        self.dirty_nodes[node] = self.dirty_version
+
+        if self.preview_evaluation is True:
+            # The preview request is cheap, unlike finding out whether
+            # the output node depends on the node, so skip that in a batch
+            if (self.batch_depth > 0 or node.IsOutputNode() or
+                any(downstream_node.IsOutputNode() for downstream_node
+                    in self.topo_order.GetDownstream(node))):
+                self.RequestPreview()
+
+    def NotifyPropertyChanged(self, node, idname=None):
+        """ Let the nodegraph know that a property of the node has been
+        changed (e.g: from the properties panel), so that the node and
+        everything downstream of it are evaluated again.
+
+        :param node: NodeBase subclass object
+        :param idname: idname of the property which changed, if known
+        """
+        self.MarkDirty(node)
+
+    def IsDirty(self, node) -> bool:
+        if node in self.dirty_nodes:
+            return True
+        if self.dirty_nodes == {} or node not in self.topo_order:
+            return False
+        return any(upstream_node in self.dirty_nodes
+                   for upstream_node in self.topo_order.GetUpstream(node))
+
+    def GetDirtyNodes(self):
+        """ Get the list of nodes which need to be evaluated again,
+        in evaluation order. """
+        return self.topo_order.GetDownstreamClosure(self.dirty_nodes)
+
+    def ClearDirty(self, versions=None, evaluated=()):
+        """ Mark nodes as up to date.
+
+        :param versions: dict of the dirty versions of the marked nodes
+         which were evaluated, by node. A node which has been marked dirty
+         again since is left dirty. If None, every node is marked as up
+         to date.
+        :param evaluated: all of the nodes which were evaluated. The
+         nodes depending on a cleared node which were not evaluated
+         are marked in its place, so that they stay dirty.
+        """
+        if versions is None:
+            self.dirty_nodes = {}
+            return
+        evaluated = set(evaluated)
+        for node, version in versions.items():
+            # A node marked since the evaluation was planned has a later version
+            marked = self.dirty_nodes.get(node)
+            if marked is None or marked > version:
+                continue
+            del self.dirty_nodes[node]
+            if node not in self.topo_order:
+                continue
+            for other in self.topo_order.GetFrontier(node, evaluated):
+                if self.dirty_nodes.get(other, 0) < version:
+                    self.dirty_nodes[other] = version
+
+    def GetEvaluationOrder(self):
+        """ Get the list of nodes in the order they should be evaluated,
+        i.e: every node comes after all of the nodes connected to its inputs.
+        """
+        return self.topo_order.GetOrder()
+
+    def GetUpstream(self, node):
+        """ Get the list of nodes which the given node depends on,
+        directly or indirectly, in evaluation order. """
+        return self.topo_order.GetUpstream(node)
+
+    def GetDownstream(self, node):
+        """ Get the list of nodes which depend on the given node,
+        directly or indirectly, in evaluation order. """
+        return self.topo_order.GetDownstream(node)
+
+    def CheckConnectionIndexes(self):
+        """ Check that the connection indexes agree with the list of
+        wires. Meant for tests and debugging; this is linear in the
+        size of the graph.
+
+        :raises AssertionError: if the indexes are inconsistent
+        """
+        assert len(self.connections) == len(self._wires), "connection count"
+        assert len(self.input_wires) == len(self._wires), "input wire count"
+
+        output_count = 0
+        for src_socket, wires in self.output_wires.items():
+            assert wires != {}, "empty output wire entry"
+            for wire in wires:
+                assert wire.srcsocket is src_socket, "output wire socket"
+            output_count += len(wires)
+        assert output_count == len(self._wires), "output wire count"
+
+        node_count = 0
+        expected_node_count = 0
+        for node, wires in self.node_wires.items():
+            assert wires != {}, "empty node wire entry"
+            assert node.id in self.nodes, "node wire entry for deleted node"
+            for wire in wires:
+                assert wire.srcnode is node or wire.dstnode is node, "node wire"
+            node_count += len(wires)
+
+        for wire in self._wires:
+            # Each wire is incident to both of its nodes
+            expected_node_count += 1 if wire.srcnode is wire.dstnode else 2
+            assert self.connections[(wire.srcsocket, wire.dstsocket)] is wire, "connection"
+            assert self.input_wires[wire.dstsocket] is wire, "input wire"
+            assert wire in self.output_wires[wire.srcsocket], "output wire"
+            assert wire in self.node_wires[wire.srcnode], "source node wire"
+            assert wire in self.node_wires[wire.dstnode], "destination node wire"
+            assert wire in self.wire_index, "wire index"
+        assert node_count == expected_node_count, "node wire count"
+        assert len(self.topo_order) == len(self.nodes), "topological order"
+        assert self.topo_order.Check()
+
+        return True
 
     def SetNodeAsPreview(self, current_node):
         """ Connect the given node to the the output node in place
@@ -721,12 +1716,9 @@ class NodeGraphBase(wx.ScrolledCanvas):
         output_node_socket = output_node.GetSockets()[0]
 
         # Disconnect any previous connections
-        wires = output_node_socket.GetWires()
-        for wire in wires:
-            if wire.dstsocket == output_node_socket:
-                dst = wire.dstsocket
-                src = wire.srcsocket
-                self.DisconnectNodes(src, dst)
+        wire = self.input_wires.get(output_node_socket)
+        if wire is not None:
+            self.DisconnectNodes(wire.srcsocket, output_node_socket)
 
         # Connect the newly selected node to the output
         for socket in current_node.GetSockets():
@@ -752,56 +1744,165 @@ class NodeGraphBase(wx.ScrolledCanvas):
                 return self.nodes[node_id]
 
     def ConnectNodes(self, src_socket, dst_socket):
+        """ Connect an output socket to an input socket with a wire.
+
+        :returns: the new ``NodeWire`` object, or None if the
+        connection was refused because it would create a cycle
+        """
+        # Wires always go from the output to the input
+        if src_socket.direction != SOCKET_OUTPUT:
+            src_socket, dst_socket = dst_socket, src_socket
+
+        if self.WouldCreateCycle(src_socket, dst_socket) is True:
+            return None
+
+        # Only allow a single wire to be connected to any one input.
+        wire = self.input_wires.get(dst_socket)
+        if wire is not None:
+            self.DisconnectNodes(wire.srcsocket, dst_socket)
+
         pt1 = src_socket.node.pos + src_socket.pos
         pt2 = dst_socket.node.pos + dst_socket.pos
         direction = src_socket.direction
 
-        wire = NodeWire(src_socket, pt1, pt2, src_socket, dst_socket,
+        wire = NodeWire(self, pt1, pt2, src_socket, dst_socket,
                         direction, self.wire_curvature)
+
         wire.srcnode = src_socket.node
         wire.dstnode = dst_socket.node
-        wire._srcsocket = src_socket
-        wire._dstsocket = dst_socket
 
-        self.wires.append(wire)
+        self._wires[wire] = None
+        self.wire_index.Insert(wire, wire.GetRect())
+
+        self.input_wires[dst_socket] = wire
+        self.output_wires.setdefault(src_socket, {})[wire] = None
+        self.node_wires.setdefault(wire.srcnode, {})[wire] = None
+        self.node_wires.setdefault(wire.dstnode, {})[wire] = None
+        self.connections[(src_socket, dst_socket)] = wire
+        self.topo_order.AddEdge(wire.srcnode, wire.dstnode)
 
         src_socket.wires.append(wire)
         dst_socket.wires.append(wire)
+        self.RefreshSceneRect(wire.GetRect())
 
         dst_socket.node.EditConnection(dst_socket.idname, self.nodes[src_socket.node.id], src_socket.idname)
-        self.SendNodeConnectEvent()
-
-    def DisconnectNodes(self, src_socket, dst_socket):
-        for wire in self.wires:
-            if wire.srcsocket is src_socket and wire.dstsocket is dst_socket:
-                self.wires.remove(wire)
-                wire.dstsocket.node.EditConnection(wire.dstsocket.idname, None, None)
-
-        self.SendNodeDisconnectEvent()
+        # The results of the node under its old inputs can't be hit again
+        self.evaluator.GetResultCache().Invalidate(dst_socket.node)
+        self.MarkDirty(dst_socket.node)
+        self.SendNodeConnectEvent([(src_socket, dst_socket)])
+        return wire
+
+    def DisconnectNodes(self, src_socket, dst_socket, notify=True):
+        wire = self.connections.pop((src_socket, dst_socket), None)
+        if wire is not None:
+            del self._wires[wire]
+            self.wire_index.Remove(wire)
+            if wire is self.active_wire:
+                self.active_wire = None
+
+            del self.input_wires[dst_socket]
+            self.RemoveFromIndex(self.output_wires, src_socket, wire)
+            self.RemoveFromIndex(self.node_wires, wire.srcnode, wire)
+            self.RemoveFromIndex(self.node_wires, wire.dstnode, wire)
+            self.topo_order.RemoveEdge(wire.srcnode, wire.dstnode)
+
+            src_socket.wires.remove(wire)
+            dst_socket.wires.remove(wire)
+            self.RefreshSceneRect(wire.GetRect())
+            dst_socket.node.EditConnection(dst_socket.idname, None, None)
+            self.evaluator.GetResultCache().Invalidate(dst_socket.node)
+            self.MarkDirty(dst_socket.node)
+
+        if notify is True:
+            self.SendNodeDisconnectEvent([(src_socket, dst_socket)])
+
+    @staticmethod
+    def RemoveFromIndex(index, key, wire):
+        """ Remove the wire from the set of wires stored under
+        the key, dropping the key once it has no wires left. """
+        wires = index[key]
+        del wires[wire]
+        if wires == {}:
+            del index[key]
 
     def DeleteNode(self, node):
-        for socket in node.GetSockets():
-            for wire in socket.GetWires():
-                # Clean up any wires that are
-                # connected to this node.
-                self.DisconnectNodes(wire.srcsocket, wire.dstsocket)
+        # Clean up any wires that are connected to this node.
+        for wire in self.GetNodeWires(node):
+            self.DisconnectNodes(wire.srcsocket, wire.dstsocket)
+
+        node.InvalidateSprite()
+        self.evaluator.GetResultCache().Invalidate(node)
+        self.evaluator.RemoveStats(node)
+        self.node_index.Remove(node)
+        self.topo_order.RemoveNode(node)
+        self.dirty_nodes.pop(node, None)
+        if self.geometry is not None:
+            node.DetachGeometry()
+
         del self.nodes[node.id]
+
         self.UpdateNodeGraph()
 
     def SendNodeSelectEvent(self):
+        if self.batch_depth > 0:
+            self.batch_selection_changed = True
+            return
+
         wx.PostEvent(self,
                      gsnodegraph_nodeselect_cmd_event(id=self.GetId(),
                      value=self.active_node))
 
-    def SendNodeConnectEvent(self):
+    def SendNodeConnectEvent(self, connections=None):
+        """ Send the connect event. The event's ``connections`` is a
+        list of the (src_socket, dst_socket) pairs which were connected. """
+        if connections is None:
+            connections = []
+
+        if self.batch_depth > 0:
+            for connection in connections:
+                # Connecting what was disconnected in this batch cancels out
+                if connection in self.batch_disconnected:
+                    del self.batch_disconnected[connection]
+                else:
+                    self.batch_connected[connection] = None
+            return
+
         wx.PostEvent(self,
                      gsnodegraph_nodeconnect_cmd_event(id=self.GetId(),
-                     value=self.active_node))
+                     value=self.active_node,
+                     connections=connections))
+
+    def SendNodeDisconnectEvent(self, connections=None):
+        """ Send the disconnect event. The event's ``connections`` is a
+        list of the (src_socket, dst_socket) pairs which were disconnected. """
+        if connections is None:
+            connections = []
+
+        if self.batch_depth > 0:
+            for connection in connections:
+                # Disconnecting what was connected in this batch cancels out
+                if connection in self.batch_connected:
+                    del self.batch_connected[connection]
+                else:
+                    self.batch_disconnected[connection] = None
+            return
 
-    def SendNodeDisconnectEvent(self):
         wx.PostEvent(self,
                      gsnodegraph_nodedisconnect_cmd_event(id=self.GetId(),
-                     value=self.active_node))
+                     value=self.active_node,
+                     connections=connections))
+
+    def SendBatchEditEvent(self, selection_changed, connected, disconnected):
+        """ Send the summary event for a batch of changes. The event's
+        ``connected`` and ``disconnected`` are lists of (src_socket,
+        dst_socket) pairs and ``selection_changed`` is whether the
+        selection changed during the batch. """
+        wx.PostEvent(self,
+                     gsnodegraph_batchedit_cmd_event(id=self.GetId(),
+                     value=self.active_node,
+                     selection_changed=selection_changed,
+                     connected=connected,
+                     disconnected=disconnected))
 
     def SendMouseZoomEvent(self):
         wx.PostEvent(self,
@@ -861,6 +1962,35 @@ class NodeGraphBase(wx.ScrolledCanvas):
         self.ScenePostScale(scale_x, scale_y)
         self.ScenePostPan(window_width / 2.0, window_height / 2.0)
 
+    def GetNodesBoundingBox(self, nodes=None):
+        """ Get the bounding box of the given nodes, or of all of the
+        nodes if None, as (left, top, right, bottom) in scene coordinates.
+
+        :returns: tuple, or None if there are no nodes
+        """
+        if self.geometry is not None:
+            return self.geometry.GetBounds(nodes)
+
+        if nodes is None:
+            nodes = self.nodes.values()
+        rects = [node.GetRect() for node in nodes]
+        if rects == []:
+            return None
+        return (min(rect[0] for rect in rects),
+                min(rect[1] for rect in rects),
+                max(rect[0] + rect[2] for rect in rects),
+                max(rect[1] + rect[3] for rect in rects))
+
+    def FrameAllNodes(self, buffer=0.1):
+        """ Pan and zoom the view so that all of the nodes are shown. """
+        bounds = self.GetNodesBoundingBox()
+        if bounds is None:
+            return
+        self.FocusViewportScene(bounds, buffer)
+        self.UpdateZoomValue()
+        self.SendMouseZoomEvent()
+        self.UpdateNodeGraph()
+
     def FocusViewportScene(self, new_scene_viewport, buffer=0, lock=True):
         window_width, window_height = self.ClientSize
         left = new_scene_viewport[0]
@@ -897,6 +2027,26 @@ class NodeGraphBase(wx.ScrolledCanvas):
                 self.matrix.PostScale(scale_x, scale_y)
         self.matrix.PostTranslate(window_width / 2.0, window_height / 2.0)
 
+    def ConvertSceneRectToWindow(self, rect):
+        """ Convert a rect in scene coordinates to the bounding
+        rect of its transformed corners in window coordinates. """
+        return self.TransformRect(rect, self.ConvertSceneToWindow)
+
+    def ConvertWindowRectToScene(self, rect):
+        """ Convert a rect in window coordinates to the bounding
+        rect of its transformed corners in scene coordinates. """
+        return self.TransformRect(rect, self.ConvertWindowToScene)
+
+    def TransformRect(self, rect, convert):
+        x, y, w, h = rect
+        corners = [convert(pnt) for pnt in ((x, y), (x + w, y),
+                                            (x, y + h), (x + w, y + h))]
+        xs = [pnt[0] for pnt in corners]
+        ys = [pnt[1] for pnt in corners]
+        left = int(min(xs))
+        top = int(min(ys))
+        return wx.Rect(left, top, int(max(xs)) - left + 1, int(max(ys)) - top + 1)
+
     def ConvertSceneToWindow(self, position):
         return self.matrix.TransformPoint([position[0], position[1]])
 
@@ -3,13 +3,13 @@ import wx
 
 from gsnodegraph.constants import (BTN_NORMAL_COLOR, BTN_CLICKED_COLOR, 
                                    BTN_FOCUSED_COLOR)
-from gsnodegraph.assets import ICON_ADD_NODE
+from gsnodegraph.assets import ICON_ADD_NODE, GetAssetBitmap
 
 
 class AddNodeBtn(object):
     def __init__(self, parent):
         self.parent = parent
-        self.bitmap = ICON_ADD_NODE.GetBitmap()
+        self.bitmap = GetAssetBitmap(ICON_ADD_NODE)
         self.rect = wx.Rect(0, 0, self.bitmap.Width, self.bitmap.Height)
 
         self.focused = False
@@ -51,6 +51,6 @@ class AddNodeBtn(object):
             btn_color = BTN_NORMAL_COLOR
 
         dc.SetPen(wx.TRANSPARENT_PEN)
-        dc.SetBrush(wx.Brush(wx.Colour(btn_color)))
+        dc.SetBrush(self.parent.resources.GetBrush(btn_color))
         dc.DrawRoundedRectangle(self.GetRect(), 4)
         dc.DrawBitmap(self.GetBitmap(), pnt[0], pnt[1], useMask=False)
\ No newline at end of file
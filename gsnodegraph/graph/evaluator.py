@@ -0,0 +1,522 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import wx
+from wx.lib.newevent import NewCommandEvent
+
+from gsnodegraph.constants import (SOCKET_INPUT, PREVIEW_SCALES,
+                                   PREVIEW_DEBOUNCE_DELAY)
+from .utils.result_cache import ResultCache
+
+gsnodegraph_evaluated_cmd_event, EVT_GSNODEGRAPH_EVALUATED = NewCommandEvent()
+
+
+class EvaluationCancelled(Exception):
+    """ Raised when an evaluation is cancelled before it has finished. """
+    pass
+
+
+class EvaluationJob(object):
+    """ Handle on a running evaluation, which can be cancelled from
+    another thread. Nodes which are already running are left to finish,
+    but no more are started. """
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def Cancel(self) -> None:
+        self.cancelled.set()
+
+    def IsCancelled(self) -> bool:
+        return self.cancelled.is_set()
+
+
+class PreviewContext(object):
+    """ Context given to the ``Evaluate`` method of the nodes during
+    preview evaluation.
+
+    :param context: the context given by the host application
+    :param scale: resolution to evaluate at, relative to full resolution
+    :param final: whether this is the full resolution pass
+    :param job: the ``EvaluationJob`` of the preview; long running nodes
+     may check ``IsCancelled`` and return early
+    """
+    def __init__(self, context, scale, final, job):
+        self.context = context
+        self.scale = scale
+        self.final = final
+        self.job = job
+
+    def IsCancelled(self) -> bool:
+        return self.job.IsCancelled()
+
+
+class GraphEvaluator(object):
+    """ Evaluates the nodes of a nodegraph by calling the ``Evaluate``
+    method of each node, after the nodes connected to its inputs.
+
+    Nodes which don't depend on each other (e.g: the two inputs of a mix
+    node) are evaluated at the same time in a ``concurrent.futures``
+    pool. Node ``Evaluate`` methods are called from the pool's threads,
+    so they should not touch the UI.
+
+    Results are kept in a ``ResultCache`` and reused as long as nothing
+    upstream of the node has changed, so nodes should not modify the
+    values they are given or return.
+
+    :param nodegraph: the ``NodeGraphBase`` to evaluate
+    :param max_workers: number of threads of the default pool, or None
+     to let ``ThreadPoolExecutor`` decide
+    """
+    def __init__(self, nodegraph, max_workers=None):
+        self.nodegraph = nodegraph
+        self.max_workers = max_workers
+        self.executor = None
+        self.owns_executor = True
+        self.cache = ResultCache()
+
+        # Single thread which runs the asynchronous and preview
+        # evaluations one after the other, and their pending futures
+        self.dispatcher = None
+        self.dispatched = {}
+
+        # Progressive preview evaluation
+        self.preview_scales = PREVIEW_SCALES
+        self.preview_delay = PREVIEW_DEBOUNCE_DELAY
+        self.preview_timer = None
+        self.preview_job = None
+
+        # Timings of each node id as [total time, calls, last time]
+        self.timings = {}
+        self.timings_lock = threading.Lock()
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+        # Whether the heat is relative to the slowest node
+        # rather than the node's share of the total time
+        self.heat_relative_to_slowest = False
+
+    def GetResultCache(self) -> ResultCache:
+        return self.cache
+
+    def GetExecutor(self):
+        """ Get the pool the nodes are evaluated in, creating it if needed. """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix="gsnodegraph")
+            self.owns_executor = True
+        return self.executor
+
+    def SetExecutor(self, executor) -> None:
+        """ Evaluate the nodes in the given ``concurrent.futures`` executor
+        instead of the default thread pool. The caller is responsible for
+        shutting it down. Since nodes are passed to the pool as they are,
+        it should be a thread pool rather than a process pool. """
+        self.ShutdownExecutor()
+        self.executor = executor
+        self.owns_executor = False
+
+    def SetMaxWorkers(self, max_workers) -> None:
+        """ Set the number of threads of the default pool. """
+        self.max_workers = max_workers
+        if self.owns_executor is True:
+            self.ShutdownExecutor()
+
+    def ShutdownExecutor(self) -> None:
+        """ Shut down the default pool once the running nodes have finished. """
+        if self.executor is not None and self.owns_executor is True:
+            self.executor.shutdown(wait=False)
+        self.executor = None
+        self.owns_executor = True
+
+    def Dispatch(self, function, *args) -> None:
+        """ Run the function on the dispatcher thread, after the
+        evaluations which were dispatched before it. Running it in
+        the pool instead could take up every worker with evaluations
+        waiting for their nodes. """
+        if self.dispatcher is None:
+            self.dispatcher = ThreadPoolExecutor(max_workers=1,
+                                                 thread_name_prefix="gsnodegraph-dispatch")
+        future = self.dispatcher.submit(function, *args)
+        self.dispatched[future] = None
+        future.add_done_callback(lambda future: self.dispatched.pop(future, None))
+
+    def Shutdown(self) -> None:
+        """ Stop evaluating: cancel the preview and the evaluations which
+        haven't started, and shut down the dispatcher thread and the
+        default pool once the running nodes have finished. This is
+        called by the nodegraph when it is destroyed. """
+        self.CancelPreview()
+        for future in list(self.dispatched):
+            future.cancel()
+        if self.dispatcher is not None:
+            self.dispatcher.shutdown(wait=False)
+            self.dispatcher = None
+        self.ShutdownExecutor()
+
+    def GetPlan(self, node):
+        """ Get the nodes needed to evaluate the given node, in evaluation
+        order, along with where the values of their inputs come from.
+
+        This reads the wires, so it must be called from the UI thread.
+
+        :returns: list of (node, {input socket idname: (source node,
+         output socket idname)}, result cache key, dirty version) tuples,
+         where the dirty version is None if the node is not dirty
+        """
+        plan = []
+        keys = {}
+        versions = {}
+        for plan_node in self.nodegraph.GetUpstream(node) + [node]:
+            inputs = {}
+            for socket in plan_node.GetSockets():
+                if socket.direction == SOCKET_INPUT:
+                    wire = self.nodegraph.GetInputWire(socket)
+                    if wire is not None:
+                        inputs[socket.idname] = (wire.srcnode, wire.srcsocket.idname)
+
+            keys[plan_node] = self.cache.GetKey(plan_node,
+                {idname: (keys[src_node], src_idname)
+                 for idname, (src_node, src_idname) in inputs.items()})
+
+            # Only the marked nodes are in dirty_nodes, the nodes
+            # depending on them are dirty with the latest of their versions
+            version = self.nodegraph.dirty_nodes.get(plan_node)
+            for src_node, _ in inputs.values():
+                src_version = versions.get(src_node)
+                if src_version is not None and (version is None or src_version > version):
+                    version = src_version
+            versions[plan_node] = version
+            plan.append((plan_node, inputs, keys[plan_node], version))
+        return plan
+
+    @staticmethod
+    def GetDirtyVersions(plan, results) -> dict:
+        """ Get the dirty versions of the nodes of the plan which have
+        been brought up to date, for ``NodeGraphBase.ClearDirty``. """
+        return {node: version for node, _, _, version in plan
+                if version is not None and node in results}
+
+    def Evaluate(self, node=None, context=None):
+        """ Evaluate the given node, and the nodes it depends on, and wait
+        for the result.
+
+        :param node: node to evaluate, by default the output node
+        :param context: passed on to the ``Evaluate`` method of every node
+        :returns: dict of the values of the node's outputs
+        """
+        node = self.GetTargetNode(node)
+        plan = self.GetPlan(node)
+        results = self.Run(plan, context)
+        self.nodegraph.ClearDirty(self.GetDirtyVersions(plan, results), results)
+        return results[node]
+
+    def EvaluateAsync(self, node=None, context=None) -> None:
+        """ Evaluate the given node, and the nodes it depends on, without
+        waiting. When it is done, an EVT_GSNODEGRAPH_EVALUATED event is
+        posted to the nodegraph. The event's ``value`` is the dict of the
+        values of the node's outputs, ``results`` maps every evaluated
+        node to its outputs and ``error`` is the exception raised by a
+        node, if any, in which case ``value`` is None.
+
+        :param node: node to evaluate, by default the output node
+        :param context: passed on to the ``Evaluate`` method of every node
+        """
+        node = self.GetTargetNode(node)
+        self.Dispatch(self.RunAsync, node, self.GetPlan(node), context)
+
+    def GetTargetNode(self, node):
+        if node is None:
+            node = self.nodegraph.GetOutputNode()
+            if node is None:
+                raise ValueError("The nodegraph has no output node to evaluate")
+        return node
+
+    def RunAsync(self, node, plan, context) -> None:
+        results = {}
+        error = None
+        try:
+            results = self.Run(plan, context)
+        except Exception as exc:
+            error = exc
+        else:
+            # The dirty flags belong to the UI thread
+            wx.CallAfter(self.nodegraph.ClearDirty,
+                         self.GetDirtyVersions(plan, results), list(results))
+
+        self.PostResults(node, results, error)
+
+    def PostResults(self, node, results, error, scale=1.0, final=True) -> None:
+        wx.PostEvent(self.nodegraph,
+                     gsnodegraph_evaluated_cmd_event(id=self.nodegraph.GetId(),
+                     value=results.get(node),
+                     node=node,
+                     results=results,
+                     error=error,
+                     scale=scale,
+                     final=final))
+
+    def SetPreviewScales(self, scales) -> None:
+        """ Set the resolutions of the preview passes, relative to full
+        resolution, e.g: (0.25, 1.0) for a quarter resolution pass
+        followed by a full resolution pass. """
+        self.preview_scales = tuple(scales)
+
+    def SetPreviewDelay(self, delay) -> None:
+        """ Set how long in milliseconds to wait for further changes
+        before starting a preview evaluation. """
+        self.preview_delay = delay
+
+    def EvaluatePreview(self, node=None, context=None) -> None:
+        """ Evaluate the given node progressively for previewing it: first
+        at a low resolution so that something shows up quickly, then at
+        higher resolutions until the last of the preview scales.
+
+        Any preview evaluation in progress is cancelled, and the new one
+        starts once there have been no further requests for the preview
+        delay, so dragging a slider doesn't queue up evaluations.
+
+        Every pass posts an EVT_GSNODEGRAPH_EVALUATED event with the
+        ``scale`` it was evaluated at and whether it is the ``final`` pass.
+        The nodes are given a ``PreviewContext`` wrapping the context.
+
+        :param node: node to evaluate, by default the output node
+        :param context: the host application's context for the nodes
+        """
+        self.CancelPreview()
+        if self.preview_timer is None:
+            self.preview_timer = wx.CallLater(self.preview_delay,
+                                              self.StartPreview, node, context)
+        else:
+            self.preview_timer.Restart(self.preview_delay, node, context)
+
+    def CancelPreview(self) -> None:
+        """ Cancel the preview evaluation in progress, if any. """
+        if self.preview_timer is not None:
+            self.preview_timer.Stop()
+        if self.preview_job is not None:
+            self.preview_job.Cancel()
+            self.preview_job = None
+
+    def StartPreview(self, node, context) -> None:
+        if node is None:
+            node = self.nodegraph.GetOutputNode()
+            if node is None:
+                return
+        self.preview_job = EvaluationJob()
+        self.Dispatch(self.RunPreview, node, self.GetPlan(node), context,
+                      self.preview_job)
+
+    def RunPreview(self, node, plan, context, job) -> None:
+        for i, scale in enumerate(self.preview_scales):
+            final = i == len(self.preview_scales) - 1
+            preview_context = PreviewContext(context, scale, final, job)
+            results = {}
+            error = None
+            try:
+                results = self.Run(self.GetScaledPlan(plan, scale),
+                                   preview_context, job)
+            except EvaluationCancelled:
+                return
+            except Exception as exc:
+                error = exc
+
+            if job.IsCancelled():
+                return
+            if final and error is None:
+                wx.CallAfter(self.nodegraph.ClearDirty,
+                             self.GetDirtyVersions(plan, results), list(results))
+            self.PostResults(node, results, error, scale, final)
+            if error is not None:
+                return
+
+    @staticmethod
+    def GetScaledPlan(plan, scale) -> list:
+        """ Get the plan with result cache keys for evaluating at the
+        given scale, so that the results at each preview resolution are
+        cached apart from the full resolution ones. """
+        if scale == 1.0:
+            return plan
+        return [(node, inputs, (key, scale), version)
+                for node, inputs, key, version in plan]
+
+    def Run(self, plan, context, job=None, use_cache=True) -> dict:
+        """ Evaluate the nodes of the plan, each one as soon as the nodes
+        connected to its inputs are done. The last node of the plan is
+        the one being evaluated. Clean nodes with a cached result are not
+        evaluated, and neither is anything only they depend on.
+
+        :param job: optional ``EvaluationJob`` to stop the evaluation with
+        :param use_cache: whether to use and update the result cache
+        :returns: dict mapping each evaluated or cached node to the
+         dict of its output values
+        :raises EvaluationCancelled: if the job was cancelled
+        """
+        executor = self.GetExecutor()
+        sources = {node: inputs for node, inputs, _, _ in plan}
+        keys = {node: key for node, _, key, _ in plan}
+
+        # Going backwards from the target, look up the cached results
+        # and find which nodes actually need to be evaluated.
+        results = {}
+        needed = {plan[-1][0]}
+        for node, inputs, key, dirty_version in reversed(plan):
+            if node not in needed:
+                continue
+            outputs = None
+            if dirty_version is None and use_cache is True:
+                outputs = self.cache.Get(node, key)
+            if outputs is not None:
+                results[node] = outputs
+                needed.discard(node)
+            else:
+                needed.update(src_node for src_node, _ in inputs.values())
+
+        # Number of unfinished nodes each node is waiting for,
+        # and the nodes waiting for each node.
+        waiting = {}
+        dependents = {node: [] for node in needed}
+        for node in needed:
+            upstream = {src_node for src_node, _ in sources[node].values()
+                        if src_node in needed}
+            waiting[node] = len(upstream)
+            for src_node in upstream:
+                dependents[src_node].append(node)
+
+        running = {}
+        ready = [node for node, _, _, _ in plan
+                 if node in needed and waiting[node] == 0]
+        try:
+            while ready or running:
+                if job is not None and job.IsCancelled():
+                    raise EvaluationCancelled()
+
+                for node in ready:
+                    inputs = {idname: results[src_node].get(src_idname)
+                              for idname, (src_node, src_idname)
+                              in sources[node].items()}
+                    future = executor.submit(self.EvaluateNode, node, inputs, context)
+                    running[future] = node
+                ready = []
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    results[node] = future.result()
+                    if use_cache is True:
+                        self.cache.Set(node, keys[node], results[node])
+
+                    for dependent in dependents[node]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            ready.append(dependent)
+        finally:
+            # Don't start any more nodes if one has failed
+            for future in running:
+                future.cancel()
+            wx.CallAfter(self.nodegraph.RefreshTimingOverlay)
+        return results
+
+    def EvaluateNode(self, node, inputs, context) -> dict:
+        """ Evaluate a single node, timing how long it takes. A muted node
+        passes the first input of the same datatype through to each of
+        its outputs. """
+        start = time.perf_counter()
+        try:
+            if node.IsMuted():
+                return self.PassThrough(node, inputs)
+            outputs = node.Evaluate(inputs, context)
+            if outputs is None:
+                return {}
+            return outputs
+        finally:
+            self.RecordTiming(node, time.perf_counter() - start)
+
+    def RecordTiming(self, node, elapsed) -> None:
+        with self.timings_lock:
+            timing = self.timings.setdefault(node.id, [0.0, 0, 0.0])
+            timing[0] += elapsed
+            timing[1] += 1
+            timing[2] = elapsed
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, timing[0])
+
+    def GetNodeStats(self, node) -> dict:
+        """ Get the evaluation statistics of the node: the total ``time``
+        spent evaluating it in seconds, the ``last_time`` it took, the
+        number of ``calls``, its ``share`` of the total time of all nodes
+        and its result cache ``hits`` and ``misses``. """
+        hits, misses = self.cache.GetStats(node)
+        with self.timings_lock:
+            total, calls, last = self.timings.get(node.id, (0.0, 0, 0.0))
+            share = total / self.total_time if self.total_time > 0 else 0.0
+        return {"time": total, "last_time": last, "calls": calls,
+                "share": share, "hits": hits, "misses": misses}
+
+    def GetTotalTime(self) -> float:
+        """ Get the total time in seconds spent evaluating nodes. """
+        return self.total_time
+
+    def SetHeatRelativeToSlowest(self, relative=True) -> None:
+        """ Set whether the heat of the nodes is their time relative to
+        the slowest node, instead of their share of the total time. """
+        self.heat_relative_to_slowest = relative
+
+    def GetTimingHeat(self, node) -> tuple:
+        """ Get the total evaluation time of the node, its share of the
+        total time of all nodes and its heat from 0.0 to 1.0, as (time,
+        share, heat). The heat is the share, unless it is set to be
+        relative to the slowest node with SetHeatRelativeToSlowest. """
+        with self.timings_lock:
+            total = self.timings.get(node.id, (0.0,))[0]
+            if total == 0.0:
+                return (0.0, 0.0, 0.0)
+            share = total / self.total_time
+            if self.heat_relative_to_slowest is True:
+                return (total, share, total / self.max_time)
+            return (total, share, share)
+
+    def RemoveStats(self, node) -> None:
+        """ Forget the timings of the node, e.g: when it is deleted. """
+        with self.timings_lock:
+            timing = self.timings.pop(node.id, None)
+            if timing is not None:
+                self.total_time -= timing[0]
+                self.max_time = max([t[0] for t in self.timings.values()],
+                                    default=0.0)
+
+    def ResetStats(self) -> None:
+        """ Forget the timings and result cache statistics of all nodes. """
+        with self.timings_lock:
+            self.timings = {}
+            self.total_time = 0.0
+            self.max_time = 0.0
+        self.cache.ResetStats()
+
+    @staticmethod
+    def PassThrough(node, inputs) -> dict:
+        outputs = {}
+        for idname, output in node.outputs.items():
+            for socket in node.GetSockets():
+                if (socket.direction == SOCKET_INPUT
+                    and socket.datatype == output.datatype
+                    and socket.idname in inputs):
+                    outputs[idname] = inputs[socket.idname]
+                    break
+        return outputs
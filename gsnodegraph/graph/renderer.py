@@ -0,0 +1,84 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import wx
+
+
+class GraphRenderer(object):
+    """ Keeps the buffer bitmap of the nodegraph and the dc drawing into
+    it alive between frames, so that they only have to be created again
+    when the size of the window changes.
+
+    :param size: size of the buffer
+    :param antialias: if True, draw through an antialiased ``wx.GCDC``,
+     otherwise draw straight onto the ``wx.MemoryDC`` for speed
+    """
+    def __init__(self, size, antialias=True):
+        self.antialias = antialias
+
+        self.buffer = wx.Bitmap(max(1, size[0]), max(1, size[1]))
+        self.memdc = wx.MemoryDC()
+        self.memdc.SelectObject(self.buffer)
+        self.dc = self.CreateDC(self.memdc)
+
+    def CreateDC(self, memdc) -> wx.DC:
+        """ Get the dc for drawing into the given wx.MemoryDC, which is
+        antialiased or not in the same way as the buffer's dc. """
+        if self.antialias is True:
+            return wx.GCDC(memdc)
+
+        # Some platforms draw every dc through a graphics context
+        gc = memdc.GetGraphicsContext()
+        if gc is not None:
+            gc.SetAntialiasMode(wx.ANTIALIAS_NONE)
+        return memdc
+
+    def GetBuffer(self) -> wx.Bitmap:
+        return self.buffer
+
+    def GetDC(self) -> wx.DC:
+        return self.dc
+
+    def IsAntialiased(self) -> bool:
+        return self.antialias
+
+    def BeginFrame(self, rect=None) -> wx.DC:
+        """ Get the dc ready for drawing a new frame.
+
+        :param rect: if given, drawing is clipped to this wx.Rect
+        :returns: the dc to draw with
+        """
+        self.dc.ResetTransformMatrix()
+        self.dc.DestroyClippingRegion()
+        if rect is not None:
+            self.dc.SetClippingRegion(rect)
+        return self.dc
+
+    def EndFrame(self) -> None:
+        """ Make sure everything drawn has reached the buffer. """
+        self.dc.DestroyClippingRegion()
+        gc = self.dc.GetGraphicsContext()
+        if gc is not None:
+            gc.Flush()
+
+    def Blit(self, dc, rect) -> None:
+        """ Copy the given area of the buffer onto the dc. """
+        x, y, w, h = rect
+        dc.Blit(x, y, w, h, self.memdc, x, y)
+
+    def Destroy(self) -> None:
+        del self.dc
+        self.memdc.SelectObject(wx.NullBitmap)
@@ -0,0 +1,186 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import wx
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from gsnodegraph.constants import GEOMETRY_INITIAL_CAPACITY
+
+
+def HasNumPy() -> bool:
+    """ Whether NumPy is installed, which the geometry store needs. """
+    return numpy is not None
+
+
+class NodeGeometry(object):
+    """ Store of the node rects as contiguous NumPy arrays of the x, y,
+    width and height of every node (a struct of arrays), so that bulk
+    operations such as moving the selection, box selection, culling and
+    framing all of the nodes run as vectorized array operations.
+
+    Each node has a row, in the order the nodes were added. Removing a
+    node leaves an empty row behind until the rows are compacted, so
+    query results keep the order the nodes were added in.
+    """
+    def __init__(self, capacity=GEOMETRY_INITIAL_CAPACITY):
+        if numpy is None:
+            raise ImportError("NumPy is needed for the node geometry store")
+
+        self.x = numpy.zeros(capacity, dtype=numpy.int64)
+        self.y = numpy.zeros(capacity, dtype=numpy.int64)
+        self.w = numpy.zeros(capacity, dtype=numpy.int64)
+        self.h = numpy.zeros(capacity, dtype=numpy.int64)
+        self.used = numpy.zeros(capacity, dtype=bool)
+
+        self.rows = {}
+        self.items = []
+
+    def __contains__(self, item) -> bool:
+        return item in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def GetCapacity(self) -> int:
+        return len(self.x)
+
+    def Grow(self) -> None:
+        """ Double the capacity of the arrays. """
+        for name in ("x", "y", "w", "h", "used"):
+            array = getattr(self, name)
+            grown = numpy.zeros(len(array) * 2, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def Compact(self) -> None:
+        """ Move the rows of the nodes together, dropping the empty rows. """
+        count = len(self.items)
+        keep = numpy.flatnonzero(self.used[:count])
+        for name in ("x", "y", "w", "h", "used"):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+            array[len(keep):count] = 0
+        self.items = [self.items[row] for row in keep]
+        self.rows = {item: row for row, item in enumerate(self.items)}
+
+    def Add(self, item, pos, size) -> None:
+        """ Add the item with the given position and size. """
+        if item in self.rows:
+            self.SetPos(item, pos)
+            self.SetSize(item, size)
+            return
+
+        row = len(self.items)
+        if row == len(self.x):
+            self.Grow()
+        self.items.append(item)
+        self.rows[item] = row
+        self.used[row] = True
+        self.x[row], self.y[row] = pos[0], pos[1]
+        self.w[row], self.h[row] = size[0], size[1]
+
+    def Remove(self, item) -> tuple:
+        """ Remove the item from the store.
+
+        :returns: the (position, size) the item had
+        """
+        pos = self.GetPos(item)
+        size = self.GetSize(item)
+        row = self.rows.pop(item)
+        self.items[row] = None
+        self.used[row] = False
+
+        # Drop the empty rows once there are more of them than nodes
+        if len(self.items) > len(self.rows) * 2 + 64:
+            self.Compact()
+        return pos, size
+
+    def Clear(self) -> None:
+        self.x[:] = self.y[:] = self.w[:] = self.h[:] = 0
+        self.used[:] = False
+        self.rows = {}
+        self.items = []
+
+    def GetPos(self, item) -> wx.Point:
+        row = self.rows[item]
+        return wx.Point(int(self.x[row]), int(self.y[row]))
+
+    def SetPos(self, item, pos) -> None:
+        row = self.rows[item]
+        self.x[row], self.y[row] = pos[0], pos[1]
+
+    def GetSize(self, item) -> wx.Size:
+        row = self.rows[item]
+        return wx.Size(int(self.w[row]), int(self.h[row]))
+
+    def SetSize(self, item, size) -> None:
+        row = self.rows[item]
+        self.w[row], self.h[row] = size[0], size[1]
+
+    def GetRows(self, items):
+        """ Get the array of the rows of the given items. """
+        rows = self.rows
+        return numpy.fromiter((rows[item] for item in items),
+                              dtype=numpy.intp, count=len(items))
+
+    def Translate(self, items, dx, dy) -> None:
+        """ Move the given items by the same offset. """
+        rows = self.GetRows(items)
+        self.x[rows] += int(dx)
+        self.y[rows] += int(dy)
+
+    def QueryRect(self, rect) -> list:
+        """ Get the items whose rects intersect the given rect, like
+        ``SpatialGrid.QueryRect``, in the order they were added. """
+        x, y, w, h = rect
+        if w < 0:
+            x, w = x + w, -w
+        if h < 0:
+            y, h = y + h, -h
+
+        count = len(self.items)
+        ix = self.x[:count]
+        iy = self.y[:count]
+        mask = self.used[:count].copy()
+        mask &= ix < x + max(w, 1)
+        mask &= iy < y + max(h, 1)
+        mask &= x < ix + numpy.maximum(self.w[:count], 1)
+        mask &= y < iy + numpy.maximum(self.h[:count], 1)
+
+        items = self.items
+        return [items[row] for row in numpy.flatnonzero(mask)]
+
+    def GetBounds(self, items=None):
+        """ Get the bounding box of the given items, or of all of the
+        items if None, as (left, top, right, bottom).
+
+        :returns: tuple, or None if there are no items
+        """
+        if items is None:
+            rows = numpy.flatnonzero(self.used[:len(self.items)])
+        else:
+            rows = self.GetRows(items)
+        if len(rows) == 0:
+            return None
+
+        x = self.x[rows]
+        y = self.y[rows]
+        return (int(x.min()), int(y.min()),
+                int((x + self.w[rows]).max()), int((y + self.h[rows]).max()))
@@ -0,0 +1,90 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """ Least-recently-used cache bounded by the total size in bytes
+    of the stored values rather than by the number of entries.
+
+    :param budget: maximum total size of the values in bytes
+    :param sizeof: function returning the size of a value in bytes
+    :param on_evict: optional function called with the key and value
+     of every entry which is evicted to stay within the budget
+    """
+    def __init__(self, budget, sizeof, on_evict=None):
+        self.budget = budget
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+
+        self.entries = OrderedDict()
+        self.total_size = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def Get(self, key, default=None):
+        """ Get the value for the given key and mark it as recently used. """
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def Set(self, key, value) -> None:
+        """ Store the value, evicting the least recently used
+        values until the cache fits within the budget again. """
+        self.Remove(key)
+
+        size = self.sizeof(value)
+        if size > self.budget:
+            # Never going to fit, so don't throw everything else out for it.
+            return
+
+        self.entries[key] = (value, size)
+        self.total_size += size
+        self.Evict()
+
+    def Remove(self, key) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_size -= entry[1]
+
+    def Clear(self) -> None:
+        self.entries.clear()
+        self.total_size = 0
+
+    def Evict(self) -> None:
+        while self.total_size > self.budget and self.entries:
+            key, entry = self.entries.popitem(last=False)
+            self.total_size -= entry[1]
+            if self.on_evict is not None:
+                self.on_evict(key, entry[0])
+
+    def GetBudget(self) -> int:
+        return self.budget
+
+    def SetBudget(self, budget) -> None:
+        self.budget = budget
+        self.Evict()
+
+    def GetTotalSize(self) -> int:
+        """ Get the total size in bytes of the stored values. """
+        return self.total_size
@@ -0,0 +1,110 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import wx
+
+
+class DrawingResources(object):
+    """ Cache of the colours, pens and brushes used for drawing the
+    nodegraph so that they are created once instead of on every paint.
+
+    Colours can be given as anything ``wx.Colour`` accepts, such as the
+    tuples in ``gsnodegraph.constants`` or the hex strings of the node
+    categories and datatypes.
+    """
+    def __init__(self, node_categories, node_datatypes):
+        self.colours = {}
+        self.pens = {}
+        self.brushes = {}
+
+        # Precompute the resources for the configured category header
+        # colors and datatype socket colors. Nodes and sockets store these
+        # as wx.Colour objects, so they are keyed the same way here.
+        for color in node_categories.values():
+            self.GetHeaderColours(wx.Colour(color))
+        for color in node_datatypes.values():
+            self.GetBrush(wx.Colour(color))
+
+    @staticmethod
+    def GetKey(color):
+        """ Get a hashable key for the given color. """
+        if isinstance(color, wx.Colour):
+            return color.Get(True)
+        return color
+
+    def GetColour(self, color, lightness=100) -> wx.Colour:
+        """ Get the shared colour, optionally with its lightness changed.
+
+        :param color: colour value
+        :param lightness: lightness as accepted by ``wx.Colour.ChangeLightness``
+        """
+        key = (self.GetKey(color), lightness)
+        colour = self.colours.get(key)
+        if colour is None:
+            colour = wx.Colour(color)
+            if lightness != 100:
+                colour = colour.ChangeLightness(lightness)
+            self.colours[key] = colour
+        return colour
+
+    def GetMixedColour(self, color, other, amount) -> wx.Colour:
+        """ Get the shared colour part way between two colours.
+
+        :param amount: 0.0 for the first colour, 1.0 for the other one
+        """
+        key = ("mix", self.GetKey(color), self.GetKey(other), amount)
+        colour = self.colours.get(key)
+        if colour is None:
+            c1 = wx.Colour(color)
+            c2 = wx.Colour(other)
+            colour = wx.Colour(*[int(a + (b - a) * amount) for a, b in
+                                 zip(c1.Get(True), c2.Get(True))])
+            self.colours[key] = colour
+        return colour
+
+    def GetHeaderColours(self, color) -> tuple:
+        """ Get the colours of the header and the bottom
+        border of the header for a node category color. """
+        return (self.GetColour(color, 70), self.GetColour(color, 55))
+
+    def GetPen(self, color, width=1, style=wx.PENSTYLE_SOLID) -> wx.Pen:
+        key = (self.GetKey(color), width, style)
+        pen = self.pens.get(key)
+        if pen is None:
+            pen = wx.Pen(self.GetColour(color), width, style)
+            self.pens[key] = pen
+        return pen
+
+    def GetBrush(self, color) -> wx.Brush:
+        key = self.GetKey(color)
+        brush = self.brushes.get(key)
+        if brush is None:
+            brush = wx.Brush(self.GetColour(color))
+            self.brushes[key] = brush
+        return brush
+
+    def GetBitmapBrush(self, name, bitmap) -> wx.Brush:
+        """ Get the shared brush for the given bitmap stipple.
+
+        :param name: unique name for the brush
+        :param bitmap: wx.Bitmap used to create the brush the first time
+        """
+        key = ("bitmap", name)
+        brush = self.brushes.get(key)
+        if brush is None:
+            brush = wx.Brush(bitmap)
+            self.brushes[key] = brush
+        return brush
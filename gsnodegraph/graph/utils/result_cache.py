@@ -0,0 +1,155 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import sys
+import threading
+
+import wx
+
+from gsnodegraph.constants import RESULT_CACHE_BUDGET
+from .lru import LRUCache
+
+
+class ResultCache(object):
+    """ Cache of the outputs of evaluated nodes, so that the parts of a
+    graph which haven't changed are not evaluated again.
+
+    A result is stored under a key made of the node's id and idname, the
+    values of its properties and the keys of the results connected to its
+    inputs. The key of a node therefore changes whenever anything
+    upstream of it changes. The id is part of the key since a node may
+    get its value from elsewhere than its properties (e.g: an image
+    node). Results are evicted least recently used first once their
+    total size goes over the budget.
+
+    The cache is used from the evaluator's thread as well as the UI
+    thread, so every method takes a lock.
+
+    :param budget: maximum total size of the results in bytes
+    :param sizeof: function returning the size in bytes of a dict of
+     output values, by default ``EstimateSize``
+    """
+    def __init__(self, budget=RESULT_CACHE_BUDGET, sizeof=None):
+        if sizeof is None:
+            sizeof = self.EstimateSize
+        self.cache = LRUCache(budget, lambda entry: sizeof(entry[1]),
+                              self.OnEvict)
+        self.lock = threading.Lock()
+
+        # Keys of the stored results of each node id
+        self.node_keys = {}
+
+        # [hits, misses] of each node id
+        self.stats = {}
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    @staticmethod
+    def GetPropertyValue(prop):
+        if hasattr(prop, "GetValue"):
+            value = prop.GetValue()
+        else:
+            value = getattr(prop, "value", None)
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+        return value
+
+    def GetKey(self, node, inputs) -> tuple:
+        """ Get the key of the result of the node.
+
+        :param node: NodeBase subclass object
+        :param inputs: dict of (key of the source node's result, output
+         socket idname) tuples, by input socket idname
+        """
+        properties = tuple((prop_id, self.GetPropertyValue(prop))
+                           for prop_id, prop in sorted(node.properties.items()))
+        return (node.id, node.idname, node.IsMuted(), properties,
+                tuple(sorted(inputs.items())))
+
+    def Get(self, node, key):
+        """ Get the stored outputs for the key, or None. This counts
+        as a hit or a miss of the node. """
+        with self.lock:
+            entry = self.cache.Get(key)
+            stats = self.stats.setdefault(node.id, [0, 0])
+            if entry is None:
+                stats[1] += 1
+                return None
+            stats[0] += 1
+            return entry[1]
+
+    def Set(self, node, key, outputs) -> None:
+        with self.lock:
+            self.cache.Set(key, (node.id, outputs))
+            if key in self.cache:
+                self.node_keys.setdefault(node.id, {})[key] = None
+
+    def OnEvict(self, key, entry) -> None:
+        node_id = entry[0]
+        keys = self.node_keys.get(node_id)
+        if keys is not None:
+            keys.pop(key, None)
+            if keys == {}:
+                del self.node_keys[node_id]
+
+    def Invalidate(self, node) -> None:
+        """ Remove the stored results of the node. """
+        with self.lock:
+            for key in self.node_keys.pop(node.id, {}):
+                self.cache.Remove(key)
+
+    def Clear(self) -> None:
+        with self.lock:
+            self.cache.Clear()
+            self.node_keys = {}
+
+    def GetStats(self, node) -> tuple:
+        """ Get the number of (hits, misses) of the node. """
+        with self.lock:
+            return tuple(self.stats.get(node.id, (0, 0)))
+
+    def ResetStats(self) -> None:
+        with self.lock:
+            self.stats = {}
+
+    def GetBudget(self) -> int:
+        return self.cache.GetBudget()
+
+    def SetBudget(self, budget) -> None:
+        with self.lock:
+            self.cache.SetBudget(budget)
+
+    def GetTotalSize(self) -> int:
+        """ Get the total size in bytes of the stored results. """
+        return self.cache.GetTotalSize()
+
+    @staticmethod
+    def EstimateSize(outputs) -> int:
+        """ Estimate the memory used by a dict of output values. Arrays
+        with an ``nbytes`` attribute (e.g: numpy) and bitmaps are counted
+        by their pixel data, other values by ``sys.getsizeof``. """
+        size = sys.getsizeof(outputs)
+        for value in outputs.values():
+            if hasattr(value, "nbytes"):
+                size += int(value.nbytes)
+            elif isinstance(value, (wx.Bitmap, wx.Image)):
+                size += value.GetWidth() * value.GetHeight() * 4
+            else:
+                size += sys.getsizeof(value)
+        return size
@@ -0,0 +1,147 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+from gsnodegraph.constants import SPATIAL_GRID_CELL_SIZE
+
+
+class SpatialGrid(object):
+    """ Uniform grid spatial index over the bounding rects of items
+    (nodes or wires), for fast point and rect queries.
+
+    Rects are given as ``wx.Rect`` objects or ``(x, y, w, h)`` tuples.
+    Query results are returned in the order the items were inserted.
+    """
+    def __init__(self, cell_size=SPATIAL_GRID_CELL_SIZE):
+        self.cell_size = cell_size
+
+        self.cells = {}
+        self.items = {}
+        self.order = {}
+        self.counter = 0
+
+    def __contains__(self, item) -> bool:
+        return item in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @staticmethod
+    def NormalizeRect(rect) -> tuple:
+        x, y, w, h = rect
+        if w < 0:
+            x, w = x + w, -w
+        if h < 0:
+            y, h = y + h, -h
+        return (x, y, w, h)
+
+    def GetCellRange(self, rect) -> tuple:
+        """ Get the range of the cells covered by the rect as
+        (first column, first row, last column, last row). """
+        x, y, w, h = rect
+        size = self.cell_size
+        return (int(x // size), int(y // size),
+                int((x + max(w, 1) - 1) // size), int((y + max(h, 1) - 1) // size))
+
+    def Insert(self, item, rect) -> None:
+        """ Add the item to the index with the given bounding rect. """
+        if item in self.items:
+            self.Update(item, rect)
+            return
+
+        rect = self.NormalizeRect(rect)
+        cell_range = self.GetCellRange(rect)
+        self.items[item] = (rect, cell_range)
+        self.order[item] = self.counter
+        self.counter += 1
+        self.AddToCells(item, cell_range)
+
+    def Update(self, item, rect) -> None:
+        """ Change the bounding rect of an item which is already in the index. """
+        rect = self.NormalizeRect(rect)
+        old_range = self.items[item][1]
+        cell_range = self.GetCellRange(rect)
+        self.items[item] = (rect, cell_range)
+
+        # Small movements often stay within the same cells
+        if cell_range != old_range:
+            self.RemoveFromCells(item, old_range)
+            self.AddToCells(item, cell_range)
+
+    def Remove(self, item) -> None:
+        entry = self.items.pop(item, None)
+        if entry is not None:
+            self.RemoveFromCells(item, entry[1])
+            del self.order[item]
+
+    def Clear(self) -> None:
+        self.cells = {}
+        self.items = {}
+        self.order = {}
+
+    def AddToCells(self, item, cell_range) -> None:
+        x1, y1, x2, y2 = cell_range
+        for cx in range(x1, x2 + 1):
+            for cy in range(y1, y2 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = set()
+                    self.cells[(cx, cy)] = cell
+                cell.add(item)
+
+    def RemoveFromCells(self, item, cell_range) -> None:
+        x1, y1, x2, y2 = cell_range
+        for cx in range(x1, x2 + 1):
+            for cy in range(y1, y2 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(item)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def GetRect(self, item) -> tuple:
+        """ Get the bounding rect the item was indexed with. """
+        return self.items[item][0]
+
+    def QueryRect(self, rect) -> list:
+        """ Get the items whose bounding rects intersect the given rect. """
+        x, y, w, h = rect = self.NormalizeRect(rect)
+        x1, y1, x2, y2 = self.GetCellRange(rect)
+
+        # Only look through the cells that exist when
+        # the rect covers a lot more cells than that.
+        if (x2 - x1 + 1) * (y2 - y1 + 1) > len(self.cells):
+            cells = [cell for (cx, cy), cell in self.cells.items()
+                     if x1 <= cx <= x2 and y1 <= cy <= y2]
+        else:
+            cells = [self.cells[(cx, cy)]
+                     for cx in range(x1, x2 + 1)
+                     for cy in range(y1, y2 + 1)
+                     if (cx, cy) in self.cells]
+
+        hits = set()
+        for cell in cells:
+            for item in cell:
+                if item in hits:
+                    continue
+                ix, iy, iw, ih = self.items[item][0]
+                if (ix < x + max(w, 1) and x < ix + max(iw, 1) and
+                    iy < y + max(h, 1) and y < iy + max(ih, 1)):
+                    hits.add(item)
+
+        return sorted(hits, key=self.order.__getitem__)
+
+    def QueryPoint(self, pnt) -> list:
+        """ Get the items whose bounding rects contain the given point. """
+        return self.QueryRect((pnt[0], pnt[1], 1, 1))
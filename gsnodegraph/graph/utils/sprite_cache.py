@@ -0,0 +1,91 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import math
+import wx
+
+from gsnodegraph.constants import SPRITE_CACHE_BUDGET
+from .lru import LRUCache
+
+
+class NodeSpriteCache(object):
+    """ Cache of pre-rendered node bitmaps (sprites). Each node is
+    rendered once into an offscreen bitmap for its current visual state
+    and later frames just draw that bitmap. """
+    def __init__(self, budget=SPRITE_CACHE_BUDGET):
+        self.cache = LRUCache(budget, self.GetSpriteSize)
+
+    @staticmethod
+    def GetSpriteSize(entry) -> int:
+        bmp = entry[1]
+        return bmp.Width * bmp.Height * 4
+
+    @staticmethod
+    def GetZoomBucket(scale) -> int:
+        """ Round the scale of the view to steps of a quarter of an
+        octave so that zooming does not re-render on every step. """
+        if scale <= 0:
+            return 0
+        return int(round(math.log(scale, 2) * 4))
+
+    def SetBudget(self, budget) -> None:
+        self.cache.SetBudget(budget)
+
+    def Invalidate(self, node) -> None:
+        self.cache.Remove(node.id)
+
+    def Clear(self) -> None:
+        self.cache.Clear()
+
+    def GetSprite(self, node, scale) -> wx.Bitmap:
+        bucket = self.GetZoomBucket(scale)
+        state = node.GetSpriteState() + (bucket,)
+
+        entry = self.cache.Get(node.id)
+        if entry is not None and entry[0] == state:
+            return entry[1]
+
+        bmp = self.RenderSprite(node, math.pow(2, bucket / 4.0))
+        self.cache.Set(node.id, (state, bmp))
+        return bmp
+
+    def RenderSprite(self, node, scale) -> wx.Bitmap:
+        rect = node.GetPaintRect()
+        width = max(1, int(math.ceil(rect.width * scale)))
+        height = max(1, int(math.ceil(rect.height * scale)))
+        bmp = wx.Bitmap.FromRGBA(width, height, 0, 0, 0, 0)
+
+        # Draw the node at the origin of the sprite, at the scale it will be shown
+        matrix = wx.AffineMatrix2D()
+        matrix.Scale(scale, scale)
+        matrix.Translate(-rect.x, -rect.y)
+
+        dc = wx.MemoryDC()
+        dc.SelectObject(bmp)
+        gcdc = wx.GCDC(dc)
+        gcdc.SetTransformMatrix(matrix)
+        node.DrawNode(gcdc)
+        del gcdc
+        dc.SelectObject(wx.NullBitmap)
+        return bmp
+
+    def DrawNode(self, dc, node, scale) -> None:
+        """ Draw the node from its sprite onto the graphics context
+        of the given dc, rendering the sprite first if needed. """
+        bmp = self.GetSprite(node, scale)
+        rect = node.GetPaintRect()
+        dc.GetGraphicsContext().DrawBitmap(bmp, rect.x, rect.y,
+                                           rect.width, rect.height)
@@ -0,0 +1,210 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+
+class TopologicalOrder(object):
+    """ Topological order of the nodes of a directed acyclic graph which
+    is kept up to date as edges are added and removed, using the dynamic
+    topological sort of Pearce and Kelly.
+
+    Every node has an index, and for every edge (a, b) the index of a is
+    lower than the index of b. Adding an edge which already agrees with
+    the order costs nothing, otherwise only the nodes with indexes between
+    the two ends of the edge are visited and reordered.
+
+    There may be more than one edge between two nodes (e.g: two wires
+    from one node into different inputs of another), so edges are counted.
+    """
+    def __init__(self):
+        self.index = {}
+        self.succ = {}
+        self.pred = {}
+        self.counter = 0
+
+        # Cached list of the nodes in order
+        self.order = None
+
+    def __contains__(self, node) -> bool:
+        return node in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def AddNode(self, node) -> None:
+        """ Add a node with no edges. It goes at the end of the order. """
+        if node in self.index:
+            return
+        self.index[node] = self.counter
+        self.counter += 1
+        self.succ[node] = {}
+        self.pred[node] = {}
+        if self.order is not None:
+            self.order.append(node)
+
+    def RemoveNode(self, node) -> None:
+        """ Remove the node and all of its edges. """
+        if node not in self.index:
+            return
+        for other in self.succ[node]:
+            del self.pred[other][node]
+        for other in self.pred[node]:
+            del self.succ[other][node]
+        del self.succ[node]
+        del self.pred[node]
+        del self.index[node]
+        self.order = None
+
+    def Clear(self) -> None:
+        self.index = {}
+        self.succ = {}
+        self.pred = {}
+        self.counter = 0
+        self.order = None
+
+    def WouldCreateCycle(self, src, dst) -> bool:
+        """ Whether adding the edge from src to dst would create a cycle. """
+        if src is dst:
+            return True
+        bound = self.index[src]
+        if self.index[dst] > bound:
+            # The edge agrees with the order, so dst can't reach src
+            return False
+        return self.Search(dst, self.succ, lambda i: i <= bound, src) is None
+
+    def AddEdge(self, src, dst) -> bool:
+        """ Add an edge from src to dst, reordering the nodes if needed.
+
+        :returns: False if the edge would create a cycle, in which case
+        nothing is changed, otherwise True
+        """
+        if src is dst:
+            return False
+
+        lower = self.index[dst]
+        upper = self.index[src]
+        if lower < upper:
+            # Nodes after dst which come no later than src
+            forward = self.Search(dst, self.succ, lambda i: i <= upper, src)
+            if forward is None:
+                return False
+            # Nodes before src which come no earlier than dst
+            backward = self.Search(src, self.pred, lambda i: i >= lower)
+            self.Reorder(backward, forward)
+
+        edges = self.succ[src]
+        edges[dst] = edges.get(dst, 0) + 1
+        edges = self.pred[dst]
+        edges[src] = edges.get(src, 0) + 1
+        return True
+
+    def RemoveEdge(self, src, dst) -> None:
+        """ Remove one edge from src to dst. The order stays valid. """
+        edges = self.succ[src]
+        if edges[dst] > 1:
+            edges[dst] -= 1
+            self.pred[dst][src] -= 1
+        else:
+            del edges[dst]
+            del self.pred[dst][src]
+
+    def Search(self, start, edges, in_bounds, target=None):
+        """ Depth-first search from the start node along the given edges,
+        only visiting nodes whose index is within bounds.
+
+        :returns: list of the visited nodes, or None if the target was reached
+        """
+        index = self.index
+        visited = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other in edges[node]:
+                if other is target:
+                    return None
+                if other not in visited and in_bounds(index[other]):
+                    visited[other] = None
+                    stack.append(other)
+        return list(visited)
+
+    def Reorder(self, backward, forward) -> None:
+        """ Give the nodes reachable backwards from the source of the new
+        edge the lowest of their combined indexes, keeping the relative
+        order within each group. """
+        index = self.index
+        backward.sort(key=index.__getitem__)
+        forward.sort(key=index.__getitem__)
+        nodes = backward + forward
+        for i, node in zip(sorted(index[node] for node in nodes), nodes):
+            index[node] = i
+        self.order = None
+
+    def GetOrder(self) -> list:
+        """ Get the list of nodes in topological order. """
+        if self.order is None:
+            self.order = sorted(self.index, key=self.index.__getitem__)
+        return list(self.order)
+
+    def Sort(self, nodes) -> list:
+        """ Get the given nodes sorted in topological order. """
+        return sorted(nodes, key=self.index.__getitem__)
+
+    def GetUpstream(self, node) -> list:
+        """ Get the nodes which the node depends on, in topological order. """
+        nodes = self.Search(node, self.pred, lambda i: True)[1:]
+        nodes.sort(key=self.index.__getitem__)
+        return nodes
+
+    def GetDownstream(self, node) -> list:
+        """ Get the nodes which depend on the node, in topological order. """
+        nodes = self.Search(node, self.succ, lambda i: True)[1:]
+        nodes.sort(key=self.index.__getitem__)
+        return nodes
+
+    def GetDownstreamClosure(self, nodes) -> list:
+        """ Get the given nodes and every node which depends on any of
+        them, in topological order. """
+        visited = dict.fromkeys(nodes)
+        stack = list(visited)
+        while stack:
+            for other in self.succ[stack.pop()]:
+                if other not in visited:
+                    visited[other] = None
+                    stack.append(other)
+        return self.Sort(visited)
+
+    def GetFrontier(self, node, inside) -> list:
+        """ Get the nodes which are not inside the given set, but depend
+        directly on the node or on a node inside the set depending on it. """
+        visited = {node: None}
+        frontier = {}
+        stack = [node]
+        while stack:
+            for other in self.succ[stack.pop()]:
+                if other in inside:
+                    if other not in visited:
+                        visited[other] = None
+                        stack.append(other)
+                else:
+                    frontier[other] = None
+        return list(frontier)
+
+    def Check(self) -> bool:
+        """ Check that every edge agrees with the order, for testing. """
+        for node, edges in self.succ.items():
+            for other in edges:
+                assert self.index[node] < self.index[other], "order"
+                assert self.pred[other][node] == edges[other], "edge count"
+        return True
@@ -16,26 +16,56 @@
 
 import wx
 
-from gsnodegraph.assets.bitmaps import ICON_IMAGE
-
 from .socket import NodeSocket
-from .utils import TruncateText
+from .utils import TruncateText, GetTextExtent, InternColour
 from ..constants import (NODE_DEFAULT_WIDTH, NODE_DEFAULT_HEIGHT,
                          NODE_HEADER_MUTED_COLOR,
-                         SOCKET_INPUT, SOCKET_OUTPUT, NODE_THUMB_PADDING, NODE_Y_PADDING,
+                         SOCKET_INPUT, SOCKET_OUTPUT, SOCKET_RADIUS,
+                         NODE_THUMB_PADDING, NODE_Y_PADDING,
                          NODE_NORMAL_COLOR, NODE_MUTED_COLOR, NODE_THUMB_BORDER_COLOR,
-                         NODE_BORDER_NORMAL_COLOR, NODE_BORDER_SELECTED_COLOR)
-from ..assets import (ICON_BRUSH_CHECKERBOARD, ICON_IMAGE)
+                         NODE_BORDER_NORMAL_COLOR, NODE_BORDER_SELECTED_COLOR,
+                         HEATMAP_HOT_COLOR, NODE_THUMB_SIZE,
+                         LOD_FULL, LOD_SIMPLE)
+from ..assets import (ICON_BRUSH_CHECKERBOARD, ICON_IMAGE, GetAssetBitmap)
+
+
+class NodeLayout(object):
+    """ Layout template taken from a node after it was initialized: the
+    socket labels, types, positions and colors, the header color and the
+    truncated label. Other nodes of the same type are created from it
+    instead of working all of these out again. """
+    __slots__ = ("sockets", "has_thumbnail", "lastsocket_pos",
+                 "header_color", "label")
+
+    def __init__(self, node):
+        self.sockets = tuple((socket.label, socket.idname, socket.datatype,
+                              socket.direction, socket.pos[0], socket.pos[1],
+                              socket.color) for socket in node.sockets)
+        self.has_thumbnail = node.has_thumbnail
+        self.lastsocket_pos = getattr(node, "lastsocket_pos", None)
+        self.header_color = node.header_color
+        self.label = node.label
 
 
 class NodeBase(object):
+    """ Base class of the nodes. The attributes are kept in slots rather
+    than an instance dict to keep large graphs small. Subclasses which
+    only set these attributes can declare ``__slots__ = ()`` as well,
+    otherwise they get an instance dict for their own attributes. """
+    __slots__ = ("nodegraph", "id", "idname", "_pos", "_size", "header_color",
+                 "expanded", "selected", "active", "muted", "is_output",
+                 "sockets", "properties", "outputs", "label", "category",
+                 "has_thumbnail", "_thumbnail", "thumbnail_version",
+                 "expandicon_bmp", "checkerboard_bmp", "lastsocket_pos",
+                 "normal_size", "expanded_size", "__weakref__")
+
     def __init__(self, nodegraph, id):
         self.nodegraph = nodegraph
         self.id = id
         self.idname = None
-        self.pos = wx.Point(0, 0)
-        self.size = wx.Size(NODE_DEFAULT_WIDTH, NODE_DEFAULT_HEIGHT)
-        self.header_color = wx.Colour("#242424")
+        self._pos = wx.Point(0, 0)
+        self._size = wx.Size(NODE_DEFAULT_WIDTH, NODE_DEFAULT_HEIGHT)
+        self.header_color = InternColour("#242424")
 
         self.expanded = False
         self.selected = False
@@ -51,9 +81,49 @@ class NodeBase(object):
         self.category = None
         self.has_thumbnail = False
 
-        self.thumbnail = self.CreateEmptyBitmap()
-        self.expandicon_bmp = ICON_IMAGE.GetBitmap()
-        self.checkerboard_bmp = ICON_BRUSH_CHECKERBOARD.GetBitmap()
+        # The empty thumbnail is only created once it is drawn
+        self._thumbnail = None
+        self.thumbnail_version = 0
+        self.expandicon_bmp = GetAssetBitmap(ICON_IMAGE)
+        self.checkerboard_bmp = GetAssetBitmap(ICON_BRUSH_CHECKERBOARD)
+
+    # While the node is in the geometry store of the nodegraph,
+    # its position and size are kept there instead of in the node.
+    @property
+    def pos(self) -> wx.Point:
+        if self._pos is None:
+            return self.nodegraph.geometry.GetPos(self)
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos) -> None:
+        if self._pos is None:
+            self.nodegraph.geometry.SetPos(self, pos)
+        else:
+            self._pos = pos
+        self.nodegraph.UpdateNodeIndex(self)
+
+    @property
+    def size(self) -> wx.Size:
+        if self._size is None:
+            return self.nodegraph.geometry.GetSize(self)
+        return self._size
+
+    @size.setter
+    def size(self, size) -> None:
+        if self._size is None:
+            self.nodegraph.geometry.SetSize(self, size)
+        else:
+            self._size = size
+        self.nodegraph.UpdateNodeIndex(self)
+
+    @property
+    def thumbnail(self) -> wx.Bitmap:
+        return self.GetThumbnail()
+
+    @thumbnail.setter
+    def thumbnail(self, thumb) -> None:
+        self._thumbnail = thumb
 
     @property
     def NodeGraph(self):
@@ -71,15 +141,53 @@ class NodeBase(object):
     def NodeImageDatatype(self):
         return self.nodegraph.image_datatype
 
+    @property
+    def NodeLayoutTemplates(self):
+        return self.nodegraph.layout_templates
+
     def Init(self, idname) -> None:
-        self.InitSockets()
-        self.InitHeaderColor()
-        self.InitSize()
-        self.InitLabel()
+        # Nodes of the same type with the same exposed properties share
+        # a layout template, which is made from the first of them.
+        key = self.GetLayoutKey(idname)
+        layout = self.NodeLayoutTemplates.get(key)
+        if layout is None:
+            self.InitSockets()
+            self.InitHeaderColor()
+            self.InitSize()
+            self.InitLabel()
+            self.NodeLayoutTemplates[key] = NodeLayout(self)
+        else:
+            self.ApplyLayout(layout)
+            self.InitSize()
         self.SetIdName(idname)
 
+    def GetLayoutKey(self, idname) -> tuple:
+        """ Get the key of the layout template of the node, which is the
+        idname and the signature of the exposed properties. """
+        return (idname, tuple((prop.idname, prop.label, prop.datatype)
+                              for prop in self.properties.values()
+                              if prop.exposed and prop.can_be_exposed))
+
+    def ApplyLayout(self, layout) -> None:
+        """ Create the sockets and set the header color and
+        label of the node from the given layout template. """
+        sockets = []
+        for label, idname, datatype, direction, x, y, color in layout.sockets:
+            socket = NodeSocket(label=label, idname=idname, datatype=datatype,
+                                node=self, direction=direction)
+            socket.pos = wx.Point(x, y)
+            socket.color = color
+            sockets.append(socket)
+        self.sockets = sockets
+
+        self.has_thumbnail = layout.has_thumbnail
+        if layout.lastsocket_pos is not None:
+            self.lastsocket_pos = layout.lastsocket_pos
+        self.header_color = layout.header_color
+        self.label = layout.label
+
     def CreateEmptyBitmap(self) -> wx.Bitmap:
-        img = wx.Image(120, 120)
+        img = wx.Image(NODE_THUMB_SIZE, NODE_THUMB_SIZE)
         img.SetMaskColour(0,0,0)
         img.InitAlpha()
         return img.ConvertToBitmap()
@@ -90,7 +198,7 @@ class NodeBase(object):
     def HitTest(self, pos: wx.Point) -> None:
         # Handle expanding the node to show thumbnail hittest
         if self.HasThumbnail() and wx.GetMouseState().LeftIsDown():
-            icon_rect = self.expandicon_rect.Inflate(10, 10)
+            icon_rect = self.GetExpandIconRect().Inflate(10, 10)
             mouse_rect = wx.Rect(pos[0], pos[1], 2, 2)
             if mouse_rect.Intersects(icon_rect):
                 self.ToggleExpand()
@@ -103,8 +211,29 @@ class NodeBase(object):
     def EditConnection(self, name, binding, socket):
         pass
 
+    def NotifyPropertyChanged(self, idname=None) -> None:
+        """ Call after changing one of the node's properties so that it
+        and the nodes depending on it are evaluated again. """
+        self.nodegraph.NotifyPropertyChanged(self, idname)
+
+    def Evaluate(self, inputs, context) -> dict:
+        """ Override to compute the values of the node's outputs. This is
+        called from a thread of the nodegraph's evaluator, so it should
+        not touch the UI.
+
+        :param inputs: dict of the values connected to the input sockets,
+         by socket idname. Inputs without a wire are not included, their
+         values are in ``self.properties``.
+        :param context: whatever was passed to the evaluator
+        :returns: dict of the values of the outputs, by output idname
+        """
+        if self.IsOutputNode():
+            # The result of the output node is what is connected to it
+            return dict(inputs)
+        return {}
+
     def InitHeaderColor(self) -> None:
-        self.header_color = wx.Colour(self.NodeCategories[self.GetCategory()])
+        self.header_color = InternColour(self.NodeCategories[self.GetCategory()])
 
     def InitSockets(self) -> None:
         sockets = []
@@ -112,16 +241,17 @@ class NodeBase(object):
         outs = []
 
         # Create a list of input and output sockets with the format:
-        # [(label, idname, datatype), ...]
+        # [(label, idname, datatype, direction), ...]
         for prop_id in self.properties:
             prop = self.properties[prop_id]
             if prop.exposed and prop.can_be_exposed:
-                ins.append((prop.label, prop.idname, prop.datatype))
+                ins.append((prop.label, prop.idname, prop.datatype, SOCKET_INPUT))
 
         if self.IsOutputNode() is not True:
             for output_id in self.outputs:
                 output = self.outputs[output_id]
-                outs.append((output.label, output.idname, output.datatype))
+                outs.append((output.label, output.idname, output.datatype,
+                             SOCKET_OUTPUT))
                 # If there is an image datatype then we know there 
                 # should be a thumbnail for this node.
                 if output.datatype == self.NodeImageDatatype:
@@ -132,11 +262,10 @@ class NodeBase(object):
         w, h = self.size
 
         for i, p in enumerate(outs + ins):
-            socket_type = SOCKET_INPUT  # Socket type IN
+            socket_type = p[3]
             x = 0  # socket margin
-            if (p[0], p[1], p[2]) in outs:
+            if socket_type == SOCKET_OUTPUT:
                 x = w - x - 1
-                socket_type = SOCKET_OUTPUT  # Socket type OUT
 
             # We keep track of where the last socket is placed
             self.lastsocket_pos = 60 + 14 * i
@@ -154,7 +283,7 @@ class NodeBase(object):
         # Calculate the normal size of the node to fit
         # the amount of sockets the node has. The expanded size
         # is calculated to be the normal size plus the image thumbnail size.
-        calc_height = self.lastsocket_pos + self.thumbnail.Height + NODE_THUMB_PADDING * 2
+        calc_height = self.lastsocket_pos + self.GetThumbnailHeight() + NODE_THUMB_PADDING * 2
         self.expanded_size = wx.Size(NODE_DEFAULT_WIDTH, calc_height)
 
         self.normal_size = wx.Size(NODE_DEFAULT_WIDTH,
@@ -207,27 +336,54 @@ class NodeBase(object):
 
     def SetSize(self, size: wx.Size) -> None:
         self.size = size
+        self.InvalidateSprite()
+
+    def AttachGeometry(self) -> None:
+        """ Move the position and size of the node into
+        the geometry store of the nodegraph. """
+        if self._pos is not None:
+            self.nodegraph.geometry.Add(self, self._pos, self._size)
+            self._pos = None
+            self._size = None
+
+    def DetachGeometry(self) -> None:
+        """ Move the position and size of the node out of
+        the geometry store of the nodegraph. """
+        if self._pos is None:
+            self._pos, self._size = self.nodegraph.geometry.Remove(self)
 
     def GetRect(self) -> wx.Rect:
-        return wx.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+        pos = self.pos
+        size = self.size
+        return wx.Rect(pos[0], pos[1], size[0], size[1])
+
+    def GetPaintRect(self) -> wx.Rect:
+        """ Get the rect of the area painted by the node, including the
+        sockets which stick out over the edges of the node. """
+        return self.GetRect().Inflate(SOCKET_RADIUS + 1, SOCKET_RADIUS + 1)
 
     def IsSelected(self) -> bool:
         return self.selected
 
     def SetSelected(self, selected=True) -> None:
         self.selected = selected
+        self.InvalidateSprite()
 
     def IsActive(self) -> bool:
         return self.active
 
     def SetActive(self, active=True) -> None:
         self.active = active
+        self.InvalidateSprite()
 
     def IsMuted(self) -> bool:
         return self.muted
 
     def SetMuted(self, muted=True) -> None:
+        if muted != self.muted:
+            self.nodegraph.MarkDirty(self)
         self.muted = muted
+        self.InvalidateSprite()
         self.SetExpanded(False)
         self.SetSize(self.normal_size)
 
@@ -236,6 +392,7 @@ class NodeBase(object):
 
     def SetExpanded(self, expanded=True) -> None:
         self.expanded = expanded
+        self.InvalidateSprite()
 
     def ToggleExpand(self) -> None:
         if self.HasThumbnail():
@@ -249,13 +406,26 @@ class NodeBase(object):
     def GetSockets(self) -> list:
         return self.sockets
 
+    def GetThumbnail(self) -> wx.Bitmap:
+        """ Get the thumbnail, creating an empty one if none was set. """
+        if self._thumbnail is None:
+            self._thumbnail = self.CreateEmptyBitmap()
+        return self._thumbnail
+
+    def GetThumbnailHeight(self) -> int:
+        if self._thumbnail is None:
+            return NODE_THUMB_SIZE
+        return self._thumbnail.Height
+
     def SetThumbnail(self, thumb) -> None:
         if self.HasThumbnail():
             self.thumbnail = thumb
+            self.thumbnail_version += 1
+            self.InvalidateSprite()
             self.UpdateExpandSize()
 
     def UpdateExpandSize(self) -> None:
-        calc_height = self.lastsocket_pos + self.thumbnail.Height + NODE_THUMB_PADDING * 2
+        calc_height = self.lastsocket_pos + self.GetThumbnailHeight() + NODE_THUMB_PADDING * 2
         self.expanded_size = wx.Size(NODE_DEFAULT_WIDTH, calc_height)
         self.SetSize(self.expanded_size)
 
@@ -268,10 +438,88 @@ class NodeBase(object):
             if socket.idname == idname:
                 return socket
 
+    def GetExpandIconRect(self) -> wx.Rect:
+        """ Get the rect of the expand node thumbnail icon. """
+        x, y = self.GetPosition()
+        return wx.Rect(x+NODE_DEFAULT_WIDTH-28, y+5, 16, 16)
+
+    def GetSpriteState(self) -> tuple:
+        """ Get the values which decide how the node looks. If any of
+        these change, the cached sprite of the node is rendered again. """
+        return (self.IsSelected() or self.IsActive(), self.IsMuted(),
+                self.IsExpanded(), self.GetLabel(), self.thumbnail_version,
+                tuple(self.GetSize()), self.nodegraph.resources.GetKey(self.header_color),
+                self.GetTimingOverlay())
+
+    def GetTimingOverlay(self):
+        """ Get the text and the heat (rounded to limit the number of
+        distinct header colors) of the timing overlay, or None if the
+        overlay is not shown. """
+        if self.nodegraph.IsTimingOverlayShown() is not True:
+            return None
+        total, share, heat = self.nodegraph.GetEvaluator().GetTimingHeat(self)
+        text = "{:.1f} ms {:.0%}".format(total * 1000, share)
+        return (text, round(heat * 16) / 16)
+
+    def GetHeaderColours(self) -> tuple:
+        """ Get the colours of the header and the bottom border of the
+        header, tinted by the heat of the timing overlay if it is shown. """
+        resources = self.nodegraph.resources
+        if self.IsMuted():
+            return (resources.GetColour(NODE_HEADER_MUTED_COLOR),
+                    resources.GetColour(NODE_HEADER_MUTED_COLOR, 80))
+
+        header_color, bottom_color = resources.GetHeaderColours(self.header_color)
+        overlay = self.GetTimingOverlay()
+        if overlay is not None:
+            heat = overlay[1]
+            header_color = resources.GetMixedColour(header_color, HEATMAP_HOT_COLOR, heat)
+            bottom_color = resources.GetMixedColour(bottom_color, HEATMAP_HOT_COLOR, heat)
+        return (header_color, bottom_color)
+
+    def InvalidateSprite(self) -> None:
+        """ Throw away the cached sprite of this node, if there is one. """
+        if self.nodegraph.sprite_cache is not None:
+            self.nodegraph.sprite_cache.Invalidate(self)
+
     def Draw(self, dc) -> None:
+        """ Draw the node, from the sprite cache if it is enabled. """
+        lod = self.nodegraph.GetLevelOfDetail()
+        if lod != LOD_FULL:
+            self.DrawSimplified(dc, lod)
+            return
+
+        sprite_cache = self.nodegraph.sprite_cache
+        if sprite_cache is not None and dc.GetGraphicsContext() is not None:
+            sprite_cache.DrawNode(dc, self, self.nodegraph.GetScaleX())
+        else:
+            self.DrawNode(dc)
+
+    def DrawSimplified(self, dc, lod) -> None:
+        """ Draw the node as a single rectangle in its header color
+        for when it is too small to make out any details. """
+        resources = self.nodegraph.resources
         x, y = self.GetPosition()
         w, h = self.GetSize()
 
+        if self.IsSelected() or self.IsActive():
+            dc.SetPen(resources.GetPen(NODE_BORDER_SELECTED_COLOR, 1))
+        else:
+            dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.SetBrush(resources.GetBrush(self.GetHeaderColours()[0]))
+        dc.DrawRectangle(x, y, w, h)
+
+        if lod == LOD_SIMPLE:
+            for socket in self.sockets:
+                socket.DrawDot(dc)
+
+    def DrawNode(self, dc) -> None:
+        """ Draw the node itself onto the dc. """
+        x, y = self.GetPosition()
+        w, h = self.GetSize()
+
+        resources = self.nodegraph.resources
+
         # Node body and border
         if self.IsSelected() or self.IsActive():
             border_color = NODE_BORDER_SELECTED_COLOR
@@ -281,41 +529,48 @@ class NodeBase(object):
             node_color = NODE_MUTED_COLOR
         else:
             node_color = NODE_NORMAL_COLOR
-        dc.SetPen(wx.Pen(wx.Colour(border_color), 1))
-        dc.SetBrush(wx.Brush(wx.Colour(node_color)))
+        dc.SetPen(resources.GetPen(border_color, 1))
+        dc.SetBrush(resources.GetBrush(node_color))
         dc.DrawRoundedRectangle(x, y, w, h, 3)
 
         # Node header
-        dc.SetPen(wx.Pen(wx.TRANSPARENT_PEN))
-        if self.IsMuted():
-            header_color = wx.Colour(NODE_HEADER_MUTED_COLOR)
-            bottom_color = wx.Colour(NODE_HEADER_MUTED_COLOR).ChangeLightness(80)
-        else:
-            header_color = wx.Colour(self.header_color).ChangeLightness(70)
-            bottom_color = wx.Colour(self.header_color).ChangeLightness(55)
-        dc.SetBrush(wx.Brush(header_color))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        header_color, bottom_color = self.GetHeaderColours()
+        dc.SetBrush(resources.GetBrush(header_color))
         dc.DrawRoundedRectangle(x+1, y+1, w-2, 25, 3)
 
         # Bottom border of the node header (to cover up the rounded bottom)
-        dc.SetBrush(wx.Brush(bottom_color))
+        dc.SetBrush(resources.GetBrush(bottom_color))
         dc.DrawRectangle(x+1, y+24, w-2, 2)
 
         # Node name label
         if self.IsMuted():
-            color = wx.Colour('#fff').ChangeLightness(60)
+            color = resources.GetColour('#fff', 60)
         else:
-            color = wx.Colour('#fff').ChangeLightness(85)
+            color = resources.GetColour('#fff', 85)
         dc.SetTextForeground(color)
         dc.DrawText(self.GetLabel(), x+10, y+1)
 
+        # Evaluation time, at the right of the header
+        overlay = self.GetTimingOverlay()
+        if overlay is not None:
+            text = overlay[0]
+            right = x + w - 8
+            if self.HasThumbnail() == True and self.IsMuted() != True:
+                right = self.GetExpandIconRect()[0] - 4
+            text_w, text_h = GetTextExtent(text, wx.SMALL_FONT)
+            dc.SetFont(wx.SMALL_FONT)
+            dc.DrawText(text, right - text_w, y + (26 - text_h) // 2)
+            dc.SetFont(wx.NORMAL_FONT)
+
         # Node sockets
         [socket.Draw(dc) for socket in self.sockets]
 
         # Expand node thumbnail icon
         if self.HasThumbnail() == True and self.IsMuted() != True:
-            self.expandicon_rect = wx.Rect(x+NODE_DEFAULT_WIDTH-28, y+5, 16, 16)
-            dc.DrawBitmap(self.expandicon_bmp, self.expandicon_rect[0],
-                        self.expandicon_rect[1], True)
+            expandicon_rect = self.GetExpandIconRect()
+            dc.DrawBitmap(self.expandicon_bmp, expandicon_rect[0],
+                          expandicon_rect[1], True)
 
         # Thumbnail
         if self.IsExpanded() and self.HasThumbnail():
@@ -323,12 +578,14 @@ class NodeBase(object):
             thumb_rect = wx.Rect(int(x+NODE_THUMB_PADDING/2),
                                  int(y+self.lastsocket_pos+(NODE_Y_PADDING*2)),
                                  NODE_DEFAULT_WIDTH-NODE_THUMB_PADDING,
-                                 self.thumbnail.Height)
+                                 self.GetThumbnailHeight())
 
             # Draw thumbnail border and background
-            dc.SetPen(wx.Pen(wx.Colour(NODE_THUMB_BORDER_COLOR), 1))
-            dc.SetBrush(wx.Brush(self.checkerboard_bmp))
+            dc.SetPen(resources.GetPen(NODE_THUMB_BORDER_COLOR, 1))
+            dc.SetBrush(resources.GetBitmapBrush("checkerboard",
+                                                 self.checkerboard_bmp))
+
             dc.DrawRectangle(thumb_rect)
 
             # Draw the thumbnail
-            dc.DrawBitmap(self.thumbnail, thumb_rect[0], thumb_rect[1], True)
+            dc.DrawBitmap(self.GetThumbnail(), thumb_rect[0], thumb_rect[1], True)
@@ -17,6 +17,7 @@
 import math
 import wx
 
+from .utils import GetTextExtent, InternColour
 from ..constants import (SOCKET_BORDER_COLOR, SOCKET_INPUT, SOCKET_HIT_RADIUS, 
                          SOCKET_RADIUS, SOCKET_BORDER_COLOR)
 
@@ -26,6 +27,9 @@ class NodeSocket(object):
     Node socket showing the datatypes and flow of the node relative to
     the graph. Wires are dropped into the socket to connect nodes. 
     """
+    __slots__ = ("label", "idname", "node", "direction", "datatype",
+                 "wires", "pos", "color")
+
     def __init__(self, label, idname, datatype, node, direction):
         self.label = label
         self.idname = idname
@@ -35,8 +39,7 @@ class NodeSocket(object):
 
         self.wires = []
         self.pos = wx.Point(0, 0)
-        self.color = wx.Colour("#fff")
-        self.tdc = wx.WindowDC(wx.GetApp().GetTopWindow())
+        self.color = InternColour("#fff")
 
         #self.SetColorByDataType(self.datatype)
 
@@ -46,7 +49,7 @@ class NodeSocket(object):
 
     def SetColor(self, color) -> None:
         """ Set the socket base color based on the datatype. """
-        self.color = wx.Colour(color)  
+        self.color = InternColour(color)
 
     def CurrentSocketPos(self) -> wx.Point:
         """ Return the current coords of the node socket. """
@@ -61,14 +64,22 @@ class NodeSocket(object):
         if math.fabs(distance) < SOCKET_HIT_RADIUS:
             return True
 
+    def DrawDot(self, dc) -> None:
+        """ Draw the node socket as a plain dot without a label. """
+        pos = self.CurrentSocketPos()
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.SetBrush(self.node.nodegraph.resources.GetBrush(self.color))
+        dc.DrawRectangle(pos.x - 2, pos.y - 2, 4, 4)
+
     def Draw(self, dc) -> None:
         """ Draw the node socket. """
         pos = self.CurrentSocketPos()
-        w, h = self.tdc.GetTextExtent(self.label)
+        w, h = GetTextExtent(self.label)
 
         # Set the socket color
-        dc.SetPen(wx.Pen(wx.Colour(SOCKET_BORDER_COLOR), 1))
-        dc.SetBrush(wx.Brush(self.color))
+        resources = self.node.nodegraph.resources
+        dc.SetPen(resources.GetPen(SOCKET_BORDER_COLOR, 1))
+        dc.SetBrush(resources.GetBrush(self.color))
 
         # Draw the socket
         dc.DrawCircle(pos.x, pos.y, SOCKET_RADIUS)
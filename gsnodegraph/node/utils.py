@@ -14,6 +14,8 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 
+import wx
+
 
 def TruncateText(text_string, str_length=18):
     """ Truncate the text string after a certain
@@ -28,4 +30,76 @@ def TruncateText(text_string, str_length=18):
         text = "".join(words)
         return "{}...".format(text)
     else:
-        return text_string
\ No newline at end of file
+        return text_string
+
+
+class TextMetrics(object):
+    """ Shared text measurement service. There is one measuring dc per
+    font and the extent of each text string is only measured once.
+    Unlike a ``wx.WindowDC``, this does not need a top-level window.
+    """
+    def __init__(self):
+        self.dcs = {}
+        self.extents = {}
+
+    @staticmethod
+    def GetFontKey(font) -> tuple:
+        """ Get the key of the font from the attributes which change the
+        size of the text, so that equal fonts share their measurements
+        without building the font's description string. """
+        return (font.GetFaceName(), font.GetPointSize(), font.GetFamily(),
+                font.GetWeight(), font.GetStyle())
+
+    def GetDC(self, font) -> wx.DC:
+        """ Get the measuring dc for the given font. """
+        key = self.GetFontKey(font)
+        dc = self.dcs.get(key)
+        if dc is None:
+            dc = wx.MemoryDC()
+            dc.SelectObject(wx.Bitmap(1, 1))
+            dc.SetFont(font)
+            self.dcs[key] = dc
+        return dc
+
+    def GetTextExtent(self, text, font=None) -> tuple:
+        """ Get the (width, height) of the text drawn with the given font.
+
+        :param text: text string to measure
+        :param font: wx.Font to measure with, or None for the default font
+        """
+        if font is None:
+            font = wx.NORMAL_FONT
+        key = (self.GetFontKey(font), text)
+        extent = self.extents.get(key)
+        if extent is None:
+            extent = tuple(self.GetDC(font).GetTextExtent(text))
+            self.extents[key] = extent
+        return extent
+
+    def Clear(self) -> None:
+        self.dcs = {}
+        self.extents = {}
+
+
+# The text metrics are shared by all nodes of all nodegraphs
+text_metrics = TextMetrics()
+
+
+def GetTextExtent(text, font=None):
+    """ Get the (width, height) of the text, measuring it
+    only the first time the text is seen with the font.
+    """
+    return text_metrics.GetTextExtent(text, font)
+
+
+# Colours shared by all nodes and sockets, keyed by their RGBA value
+interned_colours = {}
+
+
+def InternColour(color) -> wx.Colour:
+    """ Get the shared wx.Colour with the value of the given colour, so
+    that nodes and sockets of the same colour don't each have their own.
+    The returned colour is shared, so it should not be changed.
+    """
+    colour = wx.Colour(color)
+    return interned_colours.setdefault(colour.Get(True), colour)
@@ -14,13 +14,17 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 
+import math
 import wx
 
-from ..constants import WIRE_NORMAL_COLOR, WIRE_ACTIVE_COLOR
+from ..constants import WIRE_NORMAL_COLOR, WIRE_ACTIVE_COLOR, LOD_FULL
 
 
 class NodeWire(object):
     """ Wire for showing a connection between two nodes. """
+    __slots__ = ("parent", "pnt1", "pnt2", "srcsocket", "dstsocket",
+                 "curvature", "direction", "srcnode", "dstnode", "active")
+
     def __init__(self, parent, pnt1, pnt2, srcsocket, dstsocket, direction, curvature):
         self.parent = parent
         self.pnt1 = pnt1
@@ -43,11 +47,20 @@ class NodeWire(object):
         min_x = min(self.pnt1[0], self.pnt2[0])
         min_y = min(self.pnt1[1], self.pnt2[1])
         size = self.pnt2 - self.pnt1
-        rect = wx.Rect(min_x - 10, min_y, abs(size[0]) + 20, abs(size[1]))
+        # The curve can bulge out horizontally as far as its control points
+        margin = max(10, int(self.curvature * 2))
+        rect = wx.Rect(min_x - margin, min_y, abs(size[0]) + margin * 2, abs(size[1]))
         return rect.Inflate(2, 2)
 
-    def Draw(self, dc) -> None:
-        """ Draw the node wire. """
+    def GetStyle(self) -> tuple:
+        """ Get the (color, width) of the pen the wire is drawn with. """
+        if self.active is True:
+            return (WIRE_ACTIVE_COLOR, 3)
+        else:
+            return (WIRE_NORMAL_COLOR, 3)
+
+    def GetSplinePoints(self) -> list:
+        """ Get the control points of the spline of the wire. """
         # Direction of wire
         sign = 1
         if self.direction == 0:
@@ -56,23 +69,131 @@ class NodeWire(object):
         # Curvature of the wire
         curvature = int(self.curvature * 2)
 
-        # Wire color
-        if self.active is True:
-            color = WIRE_ACTIVE_COLOR
+        return [self.pnt1,
+                self.pnt1 + wx.Point(curvature * sign, 0),
+                self.pnt2 - wx.Point(curvature * sign, 0),
+                self.pnt2]
+
+    def IsCurved(self) -> bool:
+        """ Whether the wire is drawn as a spline rather than a line.
+        When zoomed out too far to see the curve, a line is used. """
+        return self.curvature > 0 and self.parent.GetLevelOfDetail() == LOD_FULL
+
+    def AddToPath(self, path) -> None:
+        """ Add the wire to the given wx.GraphicsPath. The spline is built
+        from the same segments as ``wx.GCDC.DrawSpline`` uses, so that
+        the wire looks the same as when drawn on its own. """
+        x1, y1 = self.pnt1
+        path.MoveToPoint(x1, y1)
+
+        if self.IsCurved():
+            pnts = self.GetSplinePoints()
+            x2, y2 = pnts[1]
+            path.AddLineToPoint((x1 + x2) / 2, (y1 + y2) / 2)
+            for pnt in pnts[2:]:
+                x1, y1 = x2, y2
+                x2, y2 = pnt
+                path.AddQuadCurveToPoint(x1, y1, (x1 + x2) / 2, (y1 + y2) / 2)
+            path.AddLineToPoint(x2, y2)
         else:
-            color = WIRE_NORMAL_COLOR
-        dc.SetPen(wx.Pen(wx.Colour(color), 3))
+            path.AddLineToPoint(self.pnt2[0], self.pnt2[1])
 
-        # If the wire has curvature, use a spline
-        if self.curvature > 0:
-            pnts = []
-            pnts.append(self.pnt1)
-            pnts.append(self.pnt1 + wx.Point(curvature * sign, 0))
-            pnts.append(self.pnt2 - wx.Point(curvature * sign, 0))
-            pnts.append(self.pnt2)
+    def GetPolyline(self, steps=8) -> list:
+        """ Get the wire as a list of points along the same path that
+        is drawn, with each curved segment split into the given
+        number of straight steps. """
+        x1, y1 = self.pnt1
+        if not self.IsCurved():
+            return [(x1, y1), (self.pnt2[0], self.pnt2[1])]
+
+        pnts = self.GetSplinePoints()
+        x2, y2 = pnts[1]
+        start = ((x1 + x2) / 2, (y1 + y2) / 2)
+        polyline = [(x1, y1), start]
+        for pnt in pnts[2:]:
+            x1, y1 = x2, y2
+            x2, y2 = pnt
+            end = ((x1 + x2) / 2, (y1 + y2) / 2)
+            # Quadratic bezier from start to end with (x1, y1) as control
+            for i in range(1, steps + 1):
+                t = i / steps
+                a = (1 - t) * (1 - t)
+                b = 2 * (1 - t) * t
+                c = t * t
+                polyline.append((a * start[0] + b * x1 + c * end[0],
+                                 a * start[1] + b * y1 + c * end[1]))
+            start = end
+        polyline.append((x2, y2))
+        return polyline
+
+    def GetDistance(self, pnt) -> float:
+        """ Get the distance from the point to the nearest point of the wire. """
+        px, py = pnt[0], pnt[1]
+        polyline = self.GetPolyline()
+        distance = None
+        for (x1, y1), (x2, y2) in zip(polyline, polyline[1:]):
+            dx = x2 - x1
+            dy = y2 - y1
+            length = dx * dx + dy * dy
+            if length == 0:
+                t = 0
+            else:
+                t = max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / length))
+            d = math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+            if distance is None or d < distance:
+                distance = d
+        return distance
 
-            dc.DrawSpline(pnts)
+    def HitTest(self, pnt, tolerance) -> bool:
+        """ Returns True if the point is within tolerance of the wire. """
+        return self.GetDistance(pnt) <= tolerance
+
+    def IntersectsLine(self, pnt1, pnt2) -> bool:
+        """ Returns True if the line between the two points crosses the wire. """
+        polyline = self.GetPolyline()
+        for seg1, seg2 in zip(polyline, polyline[1:]):
+            if SegmentsIntersect(pnt1, pnt2, seg1, seg2):
+                return True
+        return False
+
+    def Draw(self, dc) -> None:
+        """ Draw the node wire. """
+        color, width = self.GetStyle()
+        dc.SetPen(self.parent.resources.GetPen(color, width))
+
+        # If the wire has curvature, use a spline
+        if self.IsCurved():
+            dc.DrawSpline(self.GetSplinePoints())
 
         else:
             # Otherwise, use a line
             dc.DrawLine(self.pnt1[0], self.pnt1[1], self.pnt2[0], self.pnt2[1])
+
+
+def SegmentsIntersect(a1, a2, b1, b2) -> bool:
+    """ Returns True if the line segment a1-a2 crosses the segment b1-b2. """
+    def Orientation(p, q, r):
+        value = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
+        if value > 0:
+            return 1
+        elif value < 0:
+            return -1
+        return 0
+
+    def OnSegment(p, q, r):
+        return (min(p[0], r[0]) <= q[0] <= max(p[0], r[0]) and
+                min(p[1], r[1]) <= q[1] <= max(p[1], r[1]))
+
+    o1 = Orientation(a1, a2, b1)
+    o2 = Orientation(a1, a2, b2)
+    o3 = Orientation(b1, b2, a1)
+    o4 = Orientation(b1, b2, a2)
+
+    if o1 != o2 and o3 != o4:
+        return True
+
+    # Collinear cases
+    return ((o1 == 0 and OnSegment(a1, b1, a2)) or
+            (o2 == 0 and OnSegment(a1, b2, a2)) or
+            (o3 == 0 and OnSegment(b1, a1, b2)) or
+            (o4 == 0 and OnSegment(b1, a2, b2)))
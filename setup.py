@@ -19,6 +19,9 @@ setup(
   install_requires = [
       'wxpython==4.2.1'
     ],
+  extras_require = {
+      'numpy': ['numpy'],
+    },
   classifiers = [
     'Development Status :: 2 - Pre-Alpha',
     'Intended Audience :: Developers',
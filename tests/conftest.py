@@ -0,0 +1,73 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+
+""" Fixtures for the tests, which need wxPython and are skipped without it.
+
+Run from the root of the repository with: python -m pytest tests
+"""
+
+import pytest
+
+wx = pytest.importorskip("wx")
+
+from gsnodegraph import NodeGraphBase
+from nodes import OutputNode, MixNode, ImageNode, BlurNode, BlendNode, ValueNode
+
+REGISTRY = {
+    "image_nodeid": ImageNode,
+    "mix_nodeid": MixNode,
+    "blur_nodeid": BlurNode,
+    "blend_nodeid": BlendNode,
+    "value_nodeid": ValueNode,
+    "output_nodeid": OutputNode
+}
+
+CONFIG = {
+    "image_datatype": "IMAGE",
+    "node_datatypes": {
+        "IMAGE": "#C6C62D",
+        "INTEGER": "#A0A0A0",
+        "FLOAT": "#A0A0A0",
+        "VALUE": "#A0A0A0",
+    },
+    "input_nodes_categories": ["INPUT"],
+    "node_categories": {
+        "INPUT": "#E64555",
+        "DRAW": "#AF4467",
+        "MASK": "#084D4D",
+        "CONVERT": "#564B7C",
+        "FILTER": "#558333",
+        "BLEND": "#498DB8",
+        "COLOR": "#C2AF3A",
+        "TRANSFORM": "#6B8B8B",
+        "OUTPUT": "#B33641"
+    }
+}
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = wx.App(False)
+    yield app
+
+
+@pytest.fixture
+def nodegraph(app):
+    frame = wx.Frame(None)
+    nodegraph = NodeGraphBase(frame, REGISTRY, CONFIG)
+    yield nodegraph
+    frame.Destroy()
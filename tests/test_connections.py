@@ -0,0 +1,143 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+
+import random
+
+import pytest
+
+pytest.importorskip("wx")
+
+from gsnodegraph.constants import SOCKET_INPUT, SOCKET_OUTPUT
+
+NODE_TYPES = ["image_nodeid", "mix_nodeid", "blur_nodeid",
+              "blend_nodeid", "value_nodeid"]
+
+
+def GetSockets(node, direction):
+    return [socket for socket in node.GetSockets()
+            if socket.direction == direction]
+
+
+def CheckGraph(nodegraph, connections):
+    """ Check the indexes, and that the wires match the expected
+    (src_socket, dst_socket) connections. """
+    assert nodegraph.CheckConnectionIndexes()
+    assert {(wire.srcsocket, wire.dstsocket)
+            for wire in nodegraph.wires} == connections
+    for src_socket, dst_socket in connections:
+        assert nodegraph.SocketHasWire(dst_socket) is True
+        assert nodegraph.GetInputWire(dst_socket).srcsocket is src_socket
+
+
+def test_connect_and_disconnect(nodegraph):
+    image = nodegraph.AddNode("image_nodeid")
+    blur = nodegraph.AddNode("blur_nodeid")
+    src_socket = GetSockets(image, SOCKET_OUTPUT)[0]
+    dst_socket = GetSockets(blur, SOCKET_INPUT)[0]
+
+    wire = nodegraph.ConnectNodes(src_socket, dst_socket)
+    assert nodegraph.wires == [wire]
+    assert nodegraph.GetWire(src_socket, dst_socket) is wire
+    assert nodegraph.GetNodeWires(image) == [wire]
+    CheckGraph(nodegraph, {(src_socket, dst_socket)})
+
+    nodegraph.DisconnectNodes(src_socket, dst_socket)
+    assert nodegraph.wires == []
+    CheckGraph(nodegraph, set())
+
+
+def test_connect_replaces_input(nodegraph):
+    image1 = nodegraph.AddNode("image_nodeid")
+    image2 = nodegraph.AddNode("image_nodeid")
+    blur = nodegraph.AddNode("blur_nodeid")
+    dst_socket = GetSockets(blur, SOCKET_INPUT)[0]
+
+    nodegraph.ConnectNodes(GetSockets(image1, SOCKET_OUTPUT)[0], dst_socket)
+    nodegraph.ConnectNodes(GetSockets(image2, SOCKET_OUTPUT)[0], dst_socket)
+    CheckGraph(nodegraph, {(GetSockets(image2, SOCKET_OUTPUT)[0], dst_socket)})
+
+
+def test_refuses_cycles(nodegraph):
+    blur1 = nodegraph.AddNode("blur_nodeid")
+    blur2 = nodegraph.AddNode("blur_nodeid")
+    nodegraph.ConnectNodes(GetSockets(blur1, SOCKET_OUTPUT)[0],
+                           GetSockets(blur2, SOCKET_INPUT)[0])
+
+    wire = nodegraph.ConnectNodes(GetSockets(blur2, SOCKET_OUTPUT)[0],
+                                  GetSockets(blur1, SOCKET_INPUT)[0])
+    assert wire is None
+    assert len(nodegraph.wires) == 1
+    CheckGraph(nodegraph, {(GetSockets(blur1, SOCKET_OUTPUT)[0],
+                            GetSockets(blur2, SOCKET_INPUT)[0])})
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_edits(nodegraph, seed):
+    rng = random.Random(seed)
+    nodes = []
+    connections = set()
+
+    def Connect():
+        src_node, dst_node = rng.sample(nodes, 2)
+        src_sockets = GetSockets(src_node, SOCKET_OUTPUT)
+        dst_sockets = GetSockets(dst_node, SOCKET_INPUT)
+        if src_sockets == [] or dst_sockets == []:
+            return
+        src_socket = rng.choice(src_sockets)
+        dst_socket = rng.choice(dst_sockets)
+
+        cycle = nodegraph.WouldCreateCycle(src_socket, dst_socket)
+        wire = nodegraph.ConnectNodes(src_socket, dst_socket)
+        assert (wire is None) is cycle
+        if wire is not None:
+            # Any other wire into the input is replaced
+            for connection in list(connections):
+                if connection[1] is dst_socket:
+                    connections.remove(connection)
+            connections.add((src_socket, dst_socket))
+
+    def Disconnect():
+        if connections != set():
+            connection = rng.choice(sorted(connections, key=id))
+            nodegraph.DisconnectNodes(*connection)
+            connections.remove(connection)
+
+    def Delete():
+        node = nodes.pop(rng.randrange(len(nodes)))
+        nodegraph.DeleteNode(node)
+        for connection in list(connections):
+            if (connection[0].node is node
+                or connection[1].node is node):
+                connections.remove(connection)
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.15 or len(nodes) < 2:
+            nodes.append(nodegraph.AddNode(rng.choice(NODE_TYPES)))
+        elif action < 0.6:
+            Connect()
+        elif action < 0.8:
+            Disconnect()
+        elif action < 0.9:
+            Delete()
+        else:
+            with nodegraph.Batch():
+                for i in range(5):
+                    rng.choice([Connect, Disconnect])()
+        CheckGraph(nodegraph, connections)
+
+    assert len(nodegraph.nodes) == len(nodes)
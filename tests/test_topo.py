@@ -0,0 +1,138 @@
+# ----------------------------------------------------------------------------
+# gsnodegraph Copyright 2019-2022 by Noah Rahm and contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+
+import random
+
+import pytest
+
+pytest.importorskip("wx")
+
+from gsnodegraph.graph.utils.topo import TopologicalOrder
+
+
+class Node(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "Node({})".format(self.name)
+
+
+def Reachable(edges, start):
+    """ Get the nodes reachable from start through the counted edges. """
+    visited = set()
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        for (src, dst), count in edges.items():
+            if src is node and count > 0 and dst not in visited:
+                visited.add(dst)
+                stack.append(dst)
+    return visited
+
+
+def test_edge_order():
+    a, b, c = Node("a"), Node("b"), Node("c")
+    topo = TopologicalOrder()
+    for node in (c, b, a):
+        topo.AddNode(node)
+
+    assert topo.AddEdge(a, b) is True
+    assert topo.AddEdge(b, c) is True
+    assert topo.GetOrder() == [a, b, c]
+    assert topo.Check()
+
+
+def test_refuses_cycles():
+    a, b, c = Node("a"), Node("b"), Node("c")
+    topo = TopologicalOrder()
+    for node in (a, b, c):
+        topo.AddNode(node)
+    topo.AddEdge(a, b)
+    topo.AddEdge(b, c)
+
+    assert topo.WouldCreateCycle(c, a) is True
+    assert topo.WouldCreateCycle(a, a) is True
+    assert topo.AddEdge(c, a) is False
+    assert topo.GetOrder() == [a, b, c]
+    assert topo.Check()
+
+
+def test_counted_edges():
+    a, b = Node("a"), Node("b")
+    topo = TopologicalOrder()
+    topo.AddNode(a)
+    topo.AddNode(b)
+    topo.AddEdge(a, b)
+    topo.AddEdge(a, b)
+
+    topo.RemoveEdge(a, b)
+    assert topo.GetDownstream(a) == [b]
+    topo.RemoveEdge(a, b)
+    assert topo.GetDownstream(a) == []
+    assert topo.Check()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edits(seed):
+    rng = random.Random(seed)
+    topo = TopologicalOrder()
+    nodes = []
+    edges = {}
+
+    for step in range(400):
+        action = rng.random()
+        if action < 0.1 or len(nodes) < 2:
+            node = Node(step)
+            nodes.append(node)
+            topo.AddNode(node)
+
+        elif action < 0.6:
+            src, dst = rng.sample(nodes, 2)
+            cycle = src in Reachable(edges, dst)
+            assert topo.WouldCreateCycle(src, dst) is cycle
+            assert topo.AddEdge(src, dst) is not cycle
+            if cycle is not True:
+                edges[(src, dst)] = edges.get((src, dst), 0) + 1
+
+        elif action < 0.9:
+            existing = [edge for edge, count in edges.items() if count > 0]
+            if existing != []:
+                src, dst = rng.choice(existing)
+                topo.RemoveEdge(src, dst)
+                edges[(src, dst)] -= 1
+
+        else:
+            node = nodes.pop(rng.randrange(len(nodes)))
+            topo.RemoveNode(node)
+            edges = {edge: count for edge, count in edges.items()
+                     if node is not edge[0] and node is not edge[1]}
+
+        assert topo.Check()
+        assert len(topo) == len(nodes)
+
+    order = topo.GetOrder()
+    for (src, dst), count in edges.items():
+        if count > 0:
+            assert order.index(src) < order.index(dst)
+
+    for node in nodes:
+        downstream = topo.GetDownstream(node)
+        assert set(downstream) == Reachable(edges, node)
+        assert downstream == topo.Sort(downstream)
+        upstream = set(topo.GetUpstream(node))
+        assert upstream == {other for other in nodes
+                            if node in Reachable(edges, other)}